@@ -1,11 +1,12 @@
 # agents/ats_scoring_agent.py
-import os, json
+import os, re, json, asyncio
 from typing import List, Dict
 from dotenv import load_dotenv
-from groq import Groq
 from pydantic import BaseModel, Field, ValidationError
 from benchmarks import get_role_benchmark
 from database.policies import policy
+from agents.llm_engine import CircuitOpenError, get_llm_engine
+from database.db_operations import llm_cache_key, get_llm_completion, save_llm_completion
 
 load_dotenv()
 
@@ -60,30 +61,34 @@ class ScorePayload(BaseModel):
     grammar: int = Field(ge=0, le=100)
     job_role: str
 
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+SCORING_MODEL = os.getenv("SCORING_MODEL", "llama3-8b-8192")
 SYSTEM = "You are an ATS resume scoring expert that ONLY returns valid JSON matching the schema."
 
 def _lower_set(items: List[str]) -> set:
     return set((i or "").strip().lower() for i in items if i and isinstance(i, str))
 
+# simple ladder (shared with agents/bulk_scoring.py)
+DEGREE_LEVELS = {
+    "phd": 3, "doctorate": 3,
+    "master": 2, "m.sc": 2, "mtech": 2, "m.tech": 2, "ms": 2,
+    "bachelor": 1, "b.sc": 1, "btech": 1, "b.tech": 1, "be": 1,
+}
+
+def _degree_level(text: str) -> int:
+    """Level of the first ladder keyword found in (lowercased) free text."""
+    for k, v in DEGREE_LEVELS.items():
+        if k in text:
+            return v
+    return 0
+
+def _required_degree_level(jd_degrees: List[str]) -> int:
+    return max((DEGREE_LEVELS.get(k, 0) for k in _lower_set(jd_degrees)), default=0)
+
 def _degree_match(resume_edu: str, jd_degrees: List[str]) -> float:
     if not resume_edu or not jd_degrees:
         return 0.0
-    r = resume_edu.lower()
-    jd = _lower_set(jd_degrees)
-    # simple ladder
-    levels = {
-        "phd": 3, "doctorate": 3,
-        "master": 2, "m.sc": 2, "mtech": 2, "m.tech": 2, "ms": 2,
-        "bachelor": 1, "b.sc": 1, "btech": 1, "b.tech": 1, "be": 1,
-    }
-    def level(text: str) -> int:
-        for k, v in levels.items():
-            if k in text:
-                return v
-        return 0
-    req_level = max((levels.get(k, 0) for k in jd), default=0)
-    have_level = level(r)
+    req_level = _required_degree_level(jd_degrees)
+    have_level = _degree_level(resume_edu.lower())
     if have_level == 0 or req_level == 0:
         return 0.0
     # full if >= requirement, partial if one level below
@@ -124,8 +129,8 @@ def _coverage_ratio(required: list, have: List[str]) -> float:
     have_set = {s.strip().lower() for s in (have or []) if isinstance(s, str)}
     return (len(set(req) & have_set) / max(1, len(req)))
 
-def score_resume(parsed_resume: Dict, job_role: str, parsed_jd: Dict | None = None) -> Dict:
-    # Deterministic JD-aware components
+def _jd_components(parsed_resume: Dict, parsed_jd: Dict | None) -> Dict:
+    """Deterministic JD-aware components, computed before (and independently of) the LLM call."""
     jd_skills = []
     jd_degrees = []
     jd_exp_req = None
@@ -152,41 +157,178 @@ def score_resume(parsed_resume: Dict, job_role: str, parsed_jd: Dict | None = No
     jd_match = (skills_cov * 0.60 + exp_cov * 0.25 + degree_cov * 0.15) * 100
     jd_match = int(round(jd_match))
 
-    # LLM category scoring
-    schema = ScorePayload.model_json_schema()
-    llm_prompt = (
+    return {
+        "skills_cov": skills_cov,
+        "matched_count": matched_count,
+        "total_req": total_req,
+        "degree_cov": degree_cov,
+        "exp_cov": exp_cov,
+        "degree_requirement_met": degree_requirement_met,
+        "experience_shortfall_years": experience_shortfall_years,
+        "jd_match": jd_match,
+    }
+
+# === Scoring prompt ===
+# Only fields the rubric uses go to the LLM (no file_name, email, segments); raw_text is
+# whitespace-compacted and cut to PROMPT_RESUME_TOKEN_BUDGET (estimated at ~4 chars/token).
+PROMPT_RESUME_TOKEN_BUDGET = int(os.getenv("PROMPT_RESUME_TOKEN_BUDGET", "1200"))
+CHARS_PER_TOKEN = 4
+_PROMPT_RESUME_FIELDS = ("skills", "experience_years", "education")
+_SCHEMA_JSON = json.dumps(ScorePayload.model_json_schema(), separators=(",", ":"))
+_INLINE_SPACE_RE = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+
+def estimate_tokens(text: str) -> int:
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _compact(text: str) -> str:
+    return _BLANK_LINES_RE.sub("\n", _INLINE_SPACE_RE.sub(" ", text or "")).strip()
+
+def _budget_resume_text(raw_text: str, segments: Dict | None, max_chars: int) -> tuple[str, bool]:
+    """
+    Fit resume text into max_chars; returns (text, truncated). With segments, the header and
+    every section keep a fair share (short ones whole, the rest cut evenly) so a long
+    experience section can't crowd out education or skills.
+    """
+    text = _compact(raw_text)
+    if len(text) <= max_chars:
+        return text, False
+    sections = (segments or {}).get("sections") or []
+    if not sections:
+        return text[:max_chars - 2].rstrip() + " …", True
+
+    bounds = [0] + [sec["start"] for sec in sections] + [len(raw_text)]
+    pieces = [_compact(raw_text[a:b]) for a, b in zip(bounds, bounds[1:])]
+    pieces = [p for p in pieces if p]
+    # Water-fill: smallest pieces first, each getting at most an equal share of what's left
+    alloc, left = {}, max_chars - len(pieces)  # one char per piece for the joining newline
+    order = sorted(range(len(pieces)), key=lambda i: len(pieces[i]))
+    for n, i in enumerate(order):
+        alloc[i] = min(len(pieces[i]), max(0, left // (len(pieces) - n)))
+        left -= alloc[i]
+    # " …" marks a cut piece and counts against its share
+    out = [p if alloc[i] >= len(p) else p[:alloc[i] - 2].rstrip() + " …" for i, p in enumerate(pieces) if alloc[i] > 2]
+    return "\n".join(out), True
+
+def build_scoring_prompt(parsed_resume: Dict, job_role: str, parsed_jd: Dict | None) -> str:
+    resume_fields = {k: parsed_resume.get(k) for k in _PROMPT_RESUME_FIELDS}
+    resume_text, truncated = _budget_resume_text(
+        parsed_resume.get("raw_text") or "",
+        parsed_resume.get("segments"),
+        PROMPT_RESUME_TOKEN_BUDGET * CHARS_PER_TOKEN,
+    )
+    prompt = (
         "Score the resume by rubric:\n"
         "- Overall match (0-100)\n- Keywords match (0-100)\n- Formatting (0-100)\n- Grammar (0-100)\n"
         "Return ONLY a JSON object with fields exactly as in the schema.\n\n"
-        f"Schema:\n{json.dumps(schema, indent=2)}\n\n"
-        f"Resume JSON:\n{json.dumps(parsed_resume, ensure_ascii=False)}\n\n"
+        f"Schema: {_SCHEMA_JSON}\n\n"
+        f"Resume fields: {json.dumps(resume_fields, ensure_ascii=False, separators=(',', ':'))}\n\n"
+        f"Resume text{' (excerpt)' if truncated else ''}:\n{resume_text}\n\n"
         f"Target Job Role: {job_role}\n"
-        f"Parsed JD (if present): {json.dumps(parsed_jd or {}, ensure_ascii=False)}\n"
+        f"Parsed JD (if present): {json.dumps(parsed_jd or {}, ensure_ascii=False, separators=(',', ':'))}\n"
         "Prioritize JD alignment when present."
     )
+    print(f"scoring prompt: ~{estimate_tokens(prompt)} tokens"
+          f" (resume text {len(resume_text)} chars{', truncated' if truncated else ''})", flush=True)
+    return prompt
+
+def _fallback_payload(job_role: str, comps: Dict, reason: str) -> Dict:
+    # Deterministic scoring stands in for the LLM; "fallback" tells save_score to cache it only briefly
+    payload = _fast_payload(job_role, comps)
+    payload["fallback"] = True
+    payload["warning"] = f"Fallback to deterministic scoring ({reason})"
+    return payload
 
+async def _llm_category_scores(parsed_resume: Dict, job_role: str, parsed_jd: Dict | None, comps: Dict) -> Dict:
+    """LLM category scoring; any LLM, JSON or schema failure yields the deterministic fallback."""
+    llm_prompt = build_scoring_prompt(parsed_resume, job_role, parsed_jd)
+    # Byte-identical prompts (e.g. rescoring after a score was deleted, or another user scoring
+    # the same resume/JD/role) are answered from the completion cache; Mongo I/O runs off the loop
+    cache_key = llm_cache_key(SCORING_MODEL, SYSTEM, llm_prompt)
     try:
-        resp = groq_client.chat.completions.create(
-            model="llama3-8b-8192",
-            messages=[
-                {"role": "system", "content": SYSTEM},
-                {"role": "user", "content": llm_prompt},
-            ],
-            temperature=0,
-            response_format={"type": "json_object"},
-        )
-        content = resp.choices[0].message.content
+        content = await asyncio.to_thread(get_llm_completion, cache_key)
+        from_cache = content is not None
+        if not from_cache:
+            content = await get_llm_engine().chat(
+                SYSTEM,
+                llm_prompt,
+                model=SCORING_MODEL,
+                temperature=0,
+                response_format={"type": "json_object"},
+            )
         data = json.loads(content)
         payload = ScorePayload.model_validate(data).model_dump()
-    except (json.JSONDecodeError, ValidationError, Exception):
-        payload = {
-            "overall": 70,
-            "keywords": int(round(skills_cov * 100)),
-            "formatting": 80,
-            "grammar": 78,
-            "job_role": job_role,
-            "warning": "Fallback due to LLM/validation error"
-        }
+    except CircuitOpenError:
+        return _fallback_payload(job_role, comps, "LLM backend unavailable")
+    except (json.JSONDecodeError, ValidationError):
+        return _fallback_payload(job_role, comps, "invalid LLM response")
+    except Exception as e:
+        return _fallback_payload(job_role, comps, f"LLM error: {type(e).__name__}")
+    # Only completions that passed validation are worth replaying
+    if not from_cache:
+        await asyncio.to_thread(save_llm_completion, cache_key, SCORING_MODEL, content)
+    return payload
+
+SCORING_MODES = ("full", "fast")
+
+def _fast_payload(job_role: str, comps: Dict) -> Dict:
+    # No LLM: overall is the deterministic JD match; formatting/grammar need the LLM and are omitted
+    return {
+        "overall": comps["jd_match"],
+        "keywords": int(round(comps["skills_cov"] * 100)),
+        "job_role": job_role,
+    }
+
+def score_resume_fast(parsed_resume: Dict, job_role: str, parsed_jd: Dict | None = None) -> Dict:
+    """Deterministic-only score (JD match components, policy boosts, CI); runs in microseconds."""
+    comps = _jd_components(parsed_resume, parsed_jd)
+    payload = _finalize_score(_fast_payload(job_role, comps), parsed_resume, job_role, parsed_jd, comps)
+    payload["mode"] = "fast"
+    return payload
+
+async def score_resume_async(parsed_resume: Dict, job_role: str, parsed_jd: Dict | None = None,
+                             mode: str = "full") -> Dict:
+    """Async scoring path; must run on the LLM engine loop (see agents/llm_engine.py)."""
+    if mode == "fast":
+        return score_resume_fast(parsed_resume, job_role, parsed_jd)
+    comps = _jd_components(parsed_resume, parsed_jd)
+    payload = await _llm_category_scores(parsed_resume, job_role, parsed_jd, comps)
+    payload = _finalize_score(payload, parsed_resume, job_role, parsed_jd, comps)
+    payload["mode"] = "full"
+    return payload
+
+def score_resume(parsed_resume: Dict, job_role: str, parsed_jd: Dict | None = None, mode: str = "full") -> Dict:
+    """Blocking wrapper around score_resume_async for request handlers; fast mode never touches the loop."""
+    if mode == "fast":
+        return score_resume_fast(parsed_resume, job_role, parsed_jd)
+    return get_llm_engine().run(score_resume_async(parsed_resume, job_role, parsed_jd))
+
+def score_resumes(items: List[tuple], mode: str = "full") -> List[Dict]:
+    """
+    Score many (parsed_resume, job_role, parsed_jd) tuples concurrently on the engine loop;
+    LLM_MAX_CONCURRENCY bounds how many calls are in flight. Results keep input order;
+    a tuple that failed outright yields its exception instead of a payload.
+    """
+    async def _all():
+        return await asyncio.gather(
+            *(score_resume_async(r, role, jd) for r, role, jd in items), return_exceptions=True
+        )
+    if not items:
+        return []
+    if mode == "fast":
+        return [score_resume_fast(r, role, jd) for r, role, jd in items]
+    return get_llm_engine().run(_all())
+
+def _finalize_score(payload: Dict, parsed_resume: Dict, job_role: str, parsed_jd: Dict | None, comps: Dict) -> Dict:
+    """Blend the LLM categories with the deterministic JD match and apply boosts, CI and summaries."""
+    skills_cov = comps["skills_cov"]
+    matched_count = comps["matched_count"]
+    total_req = comps["total_req"]
+    degree_cov = comps["degree_cov"]
+    exp_cov = comps["exp_cov"]
+    degree_requirement_met = comps["degree_requirement_met"]
+    experience_shortfall_years = comps["experience_shortfall_years"]
+    jd_match = comps["jd_match"]
 
     # Blend JD match for stability
     overall_llm = payload.get("overall", 70)
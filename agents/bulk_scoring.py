@@ -0,0 +1,126 @@
+# agents/bulk_scoring.py
+"""
+Deterministic JD-match scoring for every resume x JD pair at once.
+
+Skills are one-hot encoded over the JD skill vocabulary (resume skills no JD asks for
+can never count), so skill overlap for all pairs is a single matrix product. Experience
+and degree alignment are broadcast comparisons over per-resume / per-JD vectors.
+Every component reproduces the per-pair helpers in ats_scoring_agent exactly,
+including float rounding, so jd_match[i, j] == _jd_components(resumes[i], jds[j])["jd_match"].
+"""
+from typing import Dict, List
+
+import numpy as np
+
+from agents.ats_scoring_agent import _degree_level, _lower_set, _required_degree_level
+
+
+def _skill_vocab(skill_sets: List[set]) -> Dict[str, int]:
+    vocab = {}
+    for skills in skill_sets:
+        for s in skills:
+            vocab.setdefault(s, len(vocab))
+    return vocab
+
+
+def _one_hot(skill_sets: List[set], vocab: Dict[str, int]) -> np.ndarray:
+    # float32 so the product runs on BLAS; 0/1 overlap counts stay exact far beyond any skill list
+    m = np.zeros((len(skill_sets), max(1, len(vocab))), dtype=np.float32)
+    for row, skills in enumerate(skill_sets):
+        cols = [vocab[s] for s in skills if s in vocab]
+        m[row, cols] = 1.0
+    return m
+
+
+def _years(values) -> np.ndarray:
+    # None (unknown) becomes NaN so it can be told apart from 0 years
+    return np.array([v if isinstance(v, (int, float)) else np.nan for v in values], dtype=np.float64)
+
+
+def skills_coverage(resume_skills: List[set], jd_skills: List[set]):
+    """(coverage N x M float64, matched N x M int, required M int), as _skills_match."""
+    vocab = _skill_vocab(jd_skills)
+    overlap = _one_hot(resume_skills, vocab) @ _one_hot(jd_skills, vocab).T
+    matched = overlap.astype(np.int64)
+    required = np.array([len(j) for j in jd_skills], dtype=np.int64)
+    coverage = matched / np.maximum(1, required)[None, :]
+    # JDs without skills are neutral
+    coverage[:, required == 0] = 0.6
+    return coverage, matched, required
+
+
+def experience_alignment(resume_years: np.ndarray, jd_required: np.ndarray) -> np.ndarray:
+    """N x M, as _experience_match."""
+    ry = resume_years[:, None]
+    req = jd_required[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        partial = 0.4 + 0.6 * np.clip(ry / req, 0.0, 1.0)
+    out = np.where(ry >= req, 1.0, partial)
+    out = np.where(np.isnan(ry), 0.0, out)
+    # Neutral when the JD doesn't specify (checked first in the per-pair helper)
+    neutral = np.isnan(req) | (req <= 0)
+    return np.where(neutral, 0.6, out)
+
+
+def degree_alignment(have_levels: np.ndarray, req_levels: np.ndarray) -> np.ndarray:
+    """N x M, as _degree_match."""
+    have = have_levels[:, None]
+    req = req_levels[None, :]
+    out = np.where(have >= req, 1.0, np.where(have == req - 1, 0.6, 0.0))
+    return np.where((have == 0) | (req == 0), 0.0, out)
+
+
+def match_matrix(parsed_resumes: List[Dict], parsed_jds: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Deterministic JD-match components for all pairs. Returns N x M arrays
+    jd_match (int), skills_cov, exp_cov, degree_cov, skills_matched, plus
+    skills_required (M) and ranking: M x N resume indices, best first
+    (ties keep input order).
+    """
+    resume_skills = [_lower_set(r.get("skills") or []) for r in parsed_resumes]
+    jd_skills = [_lower_set((jd or {}).get("must_have_skills") or []) for jd in parsed_jds]
+    skills_cov, matched, required = skills_coverage(resume_skills, jd_skills)
+
+    exp_cov = experience_alignment(
+        _years(r.get("experience_years", 0) for r in parsed_resumes),
+        _years((jd or {}).get("experience_required") for jd in parsed_jds),
+    )
+
+    have_levels = np.array([_degree_level((r.get("education") or "").lower()) for r in parsed_resumes], dtype=np.int64)
+    req_levels = np.array([_required_degree_level((jd or {}).get("degrees_required") or []) for jd in parsed_jds],
+                          dtype=np.int64)
+    degree_cov = degree_alignment(have_levels, req_levels)
+
+    # Same operation order as the per-pair formula; np.rint rounds half to even like round()
+    jd_match = np.rint((skills_cov * 0.60 + exp_cov * 0.25 + degree_cov * 0.15) * 100).astype(np.int64)
+    ranking = np.argsort(-jd_match.T, axis=1, kind="stable")
+
+    return {
+        "jd_match": jd_match,
+        "skills_cov": skills_cov,
+        "exp_cov": exp_cov,
+        "degree_cov": degree_cov,
+        "skills_matched": matched,
+        "skills_required": required,
+        "ranking": ranking,
+    }
+
+
+def rank_resumes(parsed_resumes: List[Dict], parsed_jd: Dict, top_k: int | None = None) -> List[Dict]:
+    """Rank resumes against one JD; returns [{"index", "jd_match_score", "skills_matched", ...}], best first."""
+    if not parsed_resumes:
+        return []
+    m = match_matrix(parsed_resumes, [parsed_jd])
+    order = m["ranking"][0][:top_k]
+    return [
+        {
+            "index": int(i),
+            "jd_match_score": int(m["jd_match"][i, 0]),
+            "skills_matched": int(m["skills_matched"][i, 0]),
+            "skills_required": int(m["skills_required"][0]),
+            "skills_coverage": round(float(m["skills_cov"][i, 0]) * 100),
+            "exp_alignment": round(float(m["exp_cov"][i, 0]) * 100),
+            "degree_alignment": round(float(m["degree_cov"][i, 0]) * 100),
+        }
+        for i in order
+    ]
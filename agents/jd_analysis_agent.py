@@ -1,4 +1,5 @@
 import re
+from utils.skill_matcher import SKILL_MATCHER
 
 # --- Industry detection maps ---
 TITLE_TO_INDUSTRY = {
@@ -79,17 +80,12 @@ def infer_industry_from_skills(skills: list[str]) -> str | None:
 def process_job_description(jd_text: str) -> dict:
     """
     Extract required skills, experience, degrees, and industry from a job description.
-    Deterministic extraction (no AI yet) – can be later enhanced with LLM / taxonomy.
+    Deterministic extraction (no AI yet) – can be later enhanced with LLM.
     """
     text_lower = jd_text.lower()
 
-    # Simple hardcoded skill detection – later replace with skill taxonomy
-    known_skills = [
-        "python", "java", "c++", "c#", "javascript", "html", "css",
-        "react", "node.js", "machine learning", "deep learning",
-        "nlp", "sql", "power bi", "tableau", "aws", "azure", "docker"
-    ]
-    must_have_skills = sorted({skill.title() for skill in known_skills if skill in text_lower})
+    # Whole-word skill detection against the shared taxonomy (see utils/skill_matcher.py)
+    must_have_skills = sorted({skill.title() for skill in SKILL_MATCHER.find(text_lower)})
 
     # Experience requirement
     exp_match = re.search(r"(\d+)\+?\s+year", text_lower)
@@ -0,0 +1,187 @@
+# agents/llm_engine.py
+import asyncio
+import os
+import random
+import threading
+import time
+
+from dotenv import load_dotenv
+from groq import AsyncGroq, APIConnectionError, APIStatusError, APITimeoutError
+
+load_dotenv()
+
+# Scoring calls allowed in flight at once per process (across all request threads)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+# Per-attempt HTTP timeout, and the deadline for all attempts of a call (counted from when it gets a slot)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "45"))
+# Transient failures (timeouts, connection errors, 429, 5xx) are retried with full-jitter backoff
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+# Circuit breaker: after N consecutive failed calls, fail fast for the cooldown, then let one probe through
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the backend while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. closed -> open after `failures` failed calls in a row;
+    open -> half-open once `cooldown` seconds pass, admitting a single probe call whose
+    outcome closes or re-opens the circuit. Only touched from the engine loop.
+    """
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN_SECONDS):
+        self.failures = max(1, failures)
+        self.cooldown = cooldown
+        self.state = "closed"
+        self._consecutive = 0
+        self._opened_at = 0.0
+
+    def before_call(self):
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.cooldown:
+                raise CircuitOpenError("LLM circuit open; backend marked unhealthy")
+            self.state = "half-open"
+            return
+        if self.state == "half-open":
+            # A probe is already in flight
+            raise CircuitOpenError("LLM circuit half-open; waiting on probe call")
+
+    def record_success(self):
+        self._consecutive = 0
+        self.state = "closed"
+
+    def abandon(self):
+        """A call admitted by before_call ended without reaching a verdict (e.g. cancelled)."""
+        if self.state == "half-open":
+            # Cooldown has already elapsed, so the next call becomes the probe
+            self.state = "open"
+
+    def record_failure(self):
+        self._consecutive += 1
+        if self.state == "half-open" or self._consecutive >= self.failures:
+            if self.state != "open":
+                print(f"LLM circuit opened after {self._consecutive} consecutive failures", flush=True)
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (APITimeoutError, APIConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+class LLMEngine:
+    """
+    One asyncio event loop on a background thread, shared by every request thread.
+    Coroutines run on that loop, so a single AsyncGroq client (one connection pool),
+    one semaphore bounding LLM concurrency and one circuit breaker cover the whole
+    process, while sync callers just block on the returned future.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.max_concurrency = max(1, max_concurrency)
+        self.breaker = CircuitBreaker()
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-engine", daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def _ensure_client(self):
+        # Only called on the engine loop, so no locking needed
+        if self._client is None:
+            self._client = AsyncGroq(
+                api_key=os.getenv("GROQ_API_KEY"),
+                timeout=LLM_TIMEOUT_SECONDS,
+                max_retries=0,  # retries are ours, so they share the deadline and the breaker
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def submit(self, coro):
+        """Schedule a coroutine on the engine loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro):
+        """Run a coroutine on the engine loop and block the calling thread for its result."""
+        if self._loop is not None and threading.current_thread().name == "llm-engine":
+            raise RuntimeError("LLMEngine.run() called from the engine loop; await the coroutine instead")
+        return self.submit(coro).result()
+
+    async def chat(self, system: str, prompt: str, model: str, **kwargs) -> str:
+        """
+        One chat completion under the concurrency limit, the deadline and the circuit
+        breaker. The deadline starts once a concurrency slot is free, so queueing behind a
+        large batch is neither a timeout nor a backend failure. Raises CircuitOpenError
+        without calling the backend while it is marked unhealthy. Must run on the engine loop.
+        """
+        client = self._ensure_client()
+        async with self._semaphore:
+            self.breaker.before_call()
+            try:
+                content = await asyncio.wait_for(self._chat_with_retries(client, system, prompt, model, **kwargs),
+                                                 LLM_DEADLINE_SECONDS)
+            except Exception as e:
+                if _is_retryable(e):
+                    self.breaker.record_failure()  # timeouts, connection errors, 429, 5xx
+                else:
+                    self.breaker.record_success()  # the backend answered; the request itself was rejected
+                raise
+            except BaseException:
+                self.breaker.abandon()  # cancelled: no verdict, but never leave a probe wedged half-open
+                raise
+        self.breaker.record_success()
+        return content
+
+    async def _chat_with_retries(self, client, system: str, prompt: str, model: str, **kwargs) -> str:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            t0 = time.perf_counter()
+            try:
+                resp = await client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": prompt},
+                    ],
+                    **kwargs,
+                )
+                break
+            except Exception as e:
+                if attempt >= LLM_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                delay = random.uniform(0, LLM_RETRY_BASE_SECONDS * 2 ** attempt)
+                print(f"LLM {model}: attempt {attempt + 1} failed ({type(e).__name__}); "
+                      f"retrying in {delay:.2f}s", flush=True)
+                await asyncio.sleep(delay)
+        usage = getattr(resp, "usage", None)
+        print(f"LLM {model}: prompt_tokens={getattr(usage, 'prompt_tokens', '?')}"
+              f" completion_tokens={getattr(usage, 'completion_tokens', '?')}"
+              f" {int((time.perf_counter() - t0) * 1000)} ms", flush=True)
+        return resp.choices[0].message.content
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_llm_engine() -> LLMEngine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = LLMEngine()
+        return _engine
@@ -0,0 +1,270 @@
+"""
+Supervised resume-parser worker processes.
+
+Every document is parsed in a child process with:
+  - a wall-clock deadline (PARSE_TIMEOUT_SECONDS); on expiry the worker is killed
+    and replaced, and the caller gets ParseTimeoutError,
+  - an address-space cap (PARSE_MAX_MEMORY_MB on top of the worker's size at start),
+    so a pathological file hits MemoryError in the child instead of ballooning RSS,
+  - recycling after PARSE_MAX_TASKS_PER_WORKER documents to shed leaked memory.
+"""
+import atexit
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection, Pipe
+
+try:
+    import resource  # POSIX only
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+# Worker processes; 0 means one per CPU core
+PARSE_WORKERS = int(os.getenv("RESUME_PARSE_WORKERS", "0")) or (os.cpu_count() or 1)
+PARSE_TIMEOUT_SECONDS = float(os.getenv("PARSE_TIMEOUT_SECONDS", "30"))
+PARSE_MAX_MEMORY_MB = int(os.getenv("PARSE_MAX_MEMORY_MB", "1024"))
+PARSE_MAX_TASKS_PER_WORKER = int(os.getenv("PARSE_MAX_TASKS_PER_WORKER", "50"))
+# Set PARSE_ISOLATION=0 to parse on the calling thread (local debugging)
+PARSE_ISOLATION = os.getenv("PARSE_ISOLATION", "1").strip().lower() not in ("0", "false", "no")
+
+
+class ParseError(Exception):
+    """The document could not be parsed (bad/unsupported file, limits exceeded)."""
+
+
+class ParseTimeoutError(ParseError):
+    pass
+
+
+class ParseWorkerCrashed(ParseError):
+    pass
+
+
+def _limit_address_space(extra_mb: int) -> None:
+    if resource is None or extra_mb <= 0:
+        return
+    try:
+        # Current virtual size (Linux); the cap is headroom on top of what fork inherited
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        current = 0
+    limit = current + extra_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass
+
+
+def _worker_main(conn, max_memory_mb: int) -> None:
+    _limit_address_space(max_memory_mb)
+    from agents.resume_processing_agent import process_resume, shutdown_page_pool
+
+    try:
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                break
+            if msg is None:
+                break
+            file_name, data = msg
+            try:
+                conn.send(("ok", process_resume(data, file_name=file_name)))
+            except MemoryError:
+                conn.send(("error", f"Document exceeded the parser memory limit ({max_memory_mb} MB)"))
+            except Exception as e:
+                conn.send(("error", str(e)))
+    finally:
+        shutdown_page_pool()
+
+
+# Workers run `python -m agents.parser_pool <fd> <max_memory_mb>`: a fresh interpreter, not a fork
+# of the (multi-threaded) web process, which could inherit a lock another thread held at fork
+# time and hang; and not a multiprocessing spawn/forkserver child, which would re-import main.py.
+_PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _Worker:
+    def __init__(self, max_memory_mb: int):
+        self.conn, child_conn = Pipe()
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (_PACKAGE_ROOT, env.get("PYTHONPATH")) if p)
+        fd = child_conn.fileno()
+        try:
+            # Own session/process group, so kill() also takes down page-parallel PDF extraction processes
+            self.proc = subprocess.Popen(
+                [sys.executable, "-m", "agents.parser_pool", str(fd), str(max_memory_mb)],
+                pass_fds=(fd,), env=env, start_new_session=True,
+            )
+        finally:
+            child_conn.close()
+        self.tasks = 0
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def _kill_group(self) -> None:
+        # The worker leads its own process group (setsid); its page-pool children are in it too
+        if hasattr(os, "killpg") and self.proc.pid:
+            try:
+                os.killpg(self.proc.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    def kill(self) -> None:
+        self._kill_group()
+        self.proc.kill()
+        self.proc.wait()
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        if self.alive():
+            self.kill()
+        else:
+            self._kill_group()  # page-pool children that outlived a clean exit
+            self.conn.close()
+
+
+class ParserPool:
+    """Thread-safe pool of supervised parser processes, spawned lazily up to `size`."""
+
+    def __init__(self, size: int = PARSE_WORKERS, timeout: float = PARSE_TIMEOUT_SECONDS,
+                 max_memory_mb: int = PARSE_MAX_MEMORY_MB, max_tasks: int = PARSE_MAX_TASKS_PER_WORKER):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.max_memory_mb = max_memory_mb
+        self.max_tasks = max_tasks
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._live = 0
+        self._workers = set()
+
+    def _acquire(self) -> _Worker:
+        try:
+            worker = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                spawn = self._live < self.size
+                if spawn:
+                    self._live += 1
+            if spawn:
+                try:
+                    worker = _Worker(self.max_memory_mb)
+                    with self._lock:
+                        self._workers.add(worker)
+                    return worker
+                except Exception:
+                    with self._lock:
+                        self._live -= 1
+                    raise
+            worker = self._idle.get()
+        if not worker.alive():
+            self._discard(worker, kill=True)
+            return self._acquire()
+        return worker
+
+    def _discard(self, worker: _Worker, kill: bool) -> None:
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.discard(worker)
+                self._live -= 1
+
+    def close(self) -> None:
+        """Kill every worker; registered to run at interpreter exit."""
+        with self._lock:
+            workers, self._workers = list(self._workers), set()
+            self._live = 0
+        for worker in workers:
+            worker.kill()
+
+    def parse(self, data: bytes, file_name: str, timeout: float | None = None) -> dict:
+        """Parse one document in a worker; raises ParseError subclasses on failure."""
+        timeout = self.timeout if timeout is None else timeout
+        worker = self._acquire()
+        try:
+            worker.conn.send((file_name, data))
+            if not worker.conn.poll(timeout):
+                self._discard(worker, kill=True)
+                raise ParseTimeoutError(f"Parsing {file_name} exceeded {timeout:g}s and was aborted")
+            status, value = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            self._discard(worker, kill=True)
+            raise ParseWorkerCrashed(f"Parser worker died while processing {file_name} "
+                                     f"(likely exceeded {self.max_memory_mb} MB)") from e
+
+        worker.tasks += 1
+        if worker.tasks >= self.max_tasks:
+            self._discard(worker, kill=False)
+        else:
+            self._idle.put(worker)
+
+        if status != "ok":
+            raise ParseError(value)
+        return value
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_parser_pool() -> ParserPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ParserPool()
+            atexit.register(_pool.close)
+        return _pool
+
+
+def parse_resume(data: bytes, file_name: str) -> dict:
+    """Parse one uploaded resume under the pool's time and memory limits."""
+    if not PARSE_ISOLATION:
+        from agents.resume_processing_agent import process_resume
+        try:
+            return process_resume(data, file_name=file_name)
+        except Exception as e:
+            raise ParseError(str(e)) from e
+    return get_parser_pool().parse(data, file_name)
+
+
+def _parse_safe(item: tuple) -> dict:
+    """Never raises, so one bad file cannot fail the whole batch."""
+    file_name, data = item
+    try:
+        return {"file_name": file_name, "parsed": parse_resume(data, file_name)}
+    except ParseError as e:
+        return {"file_name": file_name, "error": str(e)}
+
+
+def parse_resumes(items: list) -> list:
+    """
+    Parse many resumes in parallel across the worker pool.
+    items: list of (file_name, file_bytes). Returns one dict per item (same order)
+    with either "parsed" or "error".
+    """
+    if len(items) <= 1:
+        return [_parse_safe(it) for it in items]
+    with ThreadPoolExecutor(max_workers=min(len(items), PARSE_WORKERS)) as ex:
+        return list(ex.map(_parse_safe, items))
+
+
+if __name__ == "__main__":
+    # Worker process entry point (see _Worker)
+    _worker_main(Connection(int(sys.argv[1])), int(sys.argv[2]))
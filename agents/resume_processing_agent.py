@@ -1,9 +1,29 @@
+import io
 import os
 import re
+import zipfile
+import xml.etree.ElementTree as ET
 import pdfplumber
 import docx
 import magic  # python-magic for content type detection
+import multiprocessing as mp
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from utils.skill_matcher import SKILL_MATCHER
+
+# PDF text backend: "pdfplumber" (default, full character layout), or the faster
+# text-only "pypdfium2" / "pdfminer" backends
+PDF_TEXT_BACKEND = os.getenv("PDF_TEXT_BACKEND", "pdfplumber").strip().lower()
+
+# Long PDFs: page ceiling and "enough text for scoring" budget (0 = unlimited), and
+# page-parallel extraction across PDF_PAGE_WORKERS processes (1 = sequential)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "0"))
+PDF_TEXT_CHAR_BUDGET = int(os.getenv("PDF_TEXT_CHAR_BUDGET", "0"))
+PDF_PAGE_WORKERS = int(os.getenv("PDF_PAGE_WORKERS", "1"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+
+# DOCX text backend: "stream" (default; incremental XML read, includes tables) or "python-docx"
+DOCX_TEXT_BACKEND = os.getenv("DOCX_TEXT_BACKEND", "stream").strip().lower()
 
 # --- Helpers ---
 def clean_text(text: str) -> str:
@@ -13,37 +33,252 @@ def clean_text(text: str) -> str:
     text = re.sub(r"[ \t]+", " ", text)  # collapse spaces/tabs
     return text.strip()
 
-def extract_pdf_text(file_path: str) -> str:
-    text_chunks = []
-    with pdfplumber.open(file_path) as pdf:
-        for page in pdf.pages:
-            text_chunks.append(page.extract_text() or "")
-    return clean_text("\n".join(text_chunks))
+def _pdf_pages_pdfplumber(source, start: int = 0, stop: int | None = None):
+    with pdfplumber.open(source) as pdf:
+        for page in pdf.pages[start:stop]:
+            yield page.extract_text() or ""
+
+def _pdf_pages_pypdfium2(source, start: int = 0, stop: int | None = None):
+    import pypdfium2 as pdfium  # optional backend
+    pdf = pdfium.PdfDocument(source)
+    try:
+        for i in range(start, len(pdf) if stop is None else min(stop, len(pdf))):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                yield textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+
+def _pdf_pages_pdfminer(source, start: int = 0, stop: int | None = None):
+    # pdfminer's plain text converter: same parser as pdfplumber, without per-char objects
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    fp = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    try:
+        rsrc = PDFResourceManager()
+        for i, page in enumerate(PDFPage.get_pages(fp)):
+            if i < start:
+                continue
+            if stop is not None and i >= stop:
+                break
+            buf = io.StringIO()
+            device = TextConverter(rsrc, buf, laparams=LAParams())
+            PDFPageInterpreter(rsrc, device).process_page(page)
+            device.close()
+            yield buf.getvalue()
+    finally:
+        if fp is not source:
+            fp.close()
+
+PDF_BACKENDS = {
+    "pdfplumber": _pdf_pages_pdfplumber,
+    "pypdfium2": _pdf_pages_pypdfium2,
+    "pdfminer": _pdf_pages_pdfminer,
+}
+
+def _pdf_backend(backend: str | None) -> str:
+    name = (backend or PDF_TEXT_BACKEND).strip().lower()
+    if name not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF text backend: {name} (choose from {', '.join(PDF_BACKENDS)})")
+    return name
+
+def _rewind(source):
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(0)
+    return source
+
+def iter_pdf_pages(source, backend: str | None = None, start: int = 0, stop: int | None = None):
+    """Yield the text of pages [start, stop) using the configured (or given) backend."""
+    return PDF_BACKENDS[_pdf_backend(backend)](_rewind(source), start, stop)
+
+def pdf_page_count(source, backend: str | None = None) -> int:
+    name = _pdf_backend(backend)
+    source = _rewind(source)
+    try:
+        if name == "pypdfium2":
+            import pypdfium2 as pdfium
+            pdf = pdfium.PdfDocument(source)
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+        if name == "pdfminer":
+            from pdfminer.pdfpage import PDFPage
+            if isinstance(source, (str, os.PathLike)):
+                with open(source, "rb") as fp:
+                    return sum(1 for _ in PDFPage.get_pages(fp))
+            return sum(1 for _ in PDFPage.get_pages(source))
+        with pdfplumber.open(source) as pdf:
+            return len(pdf.pages)
+    finally:
+        _rewind(source)
+
+def _take_pages(pages, max_pages: int, char_budget: int):
+    """Stop after max_pages pages, or once char_budget characters are collected (0 = no limit)."""
+    collected = 0
+    for i, text in enumerate(pages):
+        if max_pages and i >= max_pages:
+            return
+        yield text
+        collected += len(text)
+        if char_budget and collected >= char_budget:
+            return
+
+def _extract_page_range(source, backend: str, start: int, stop: int) -> list:
+    """Page-worker entry point: source is a path or the PDF bytes."""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return list(iter_pdf_pages(source, backend, start, stop))
+
+_page_pool = None
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    global _page_pool
+    if _page_pool is None:
+        ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+        _page_pool = ProcessPoolExecutor(max_workers=PDF_PAGE_WORKERS, mp_context=ctx)
+    return _page_pool
+
+def shutdown_page_pool() -> None:
+    """Stop this process's page-extraction workers (called when a parser worker exits)."""
+    global _page_pool
+    if _page_pool is not None:
+        _page_pool.shutdown(wait=False, cancel_futures=True)
+        _page_pool = None
+
+def _iter_pages_parallel(source, backend: str, page_count: int):
+    """Extract page chunks in worker processes and yield page texts in order."""
+    if not isinstance(source, (str, os.PathLike)):
+        source = _rewind(source).read()
+    # ~2 chunks per worker: enough to balance uneven pages and to stop early on a budget
+    chunk = max(1, -(-page_count // (PDF_PAGE_WORKERS * 2)))
+    pool = _get_page_pool()
+    futures = [pool.submit(_extract_page_range, source, backend, start, min(start + chunk, page_count))
+               for start in range(0, page_count, chunk)]
+    try:
+        for fut in futures:
+            yield from fut.result()
+    finally:
+        # Early stop (char budget) or error: don't start chunks nobody will read
+        for fut in futures:
+            fut.cancel()
+
+def extract_pdf_text(source, backend: str | None = None,
+                     max_pages: int | None = None, char_budget: int | None = None) -> str:
+    """
+    source: file path or seekable binary file object. backend defaults to PDF_TEXT_BACKEND.
+    Reads at most max_pages pages (PDF_MAX_PAGES) and stops once char_budget characters
+    (PDF_TEXT_CHAR_BUDGET) have been collected; 0 disables either limit. Documents with at
+    least PDF_PARALLEL_MIN_PAGES pages are split across PDF_PAGE_WORKERS processes.
+    """
+    name = _pdf_backend(backend)
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    char_budget = PDF_TEXT_CHAR_BUDGET if char_budget is None else char_budget
+
+    pages = None
+    if PDF_PAGE_WORKERS > 1:
+        page_count = pdf_page_count(source, name)
+        if max_pages:
+            page_count = min(page_count, max_pages)
+        if page_count >= PDF_PARALLEL_MIN_PAGES:
+            pages = _iter_pages_parallel(source, name, page_count)
+    if pages is None:
+        pages = iter_pdf_pages(source, name)
+    try:
+        return clean_text("\n".join(_take_pages(pages, max_pages, char_budget)))
+    finally:
+        pages.close()  # release the document / pending chunks right away on early stop
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+def iter_docx_blocks(source):
+    """
+    Stream word/document.xml straight out of the zip and yield text blocks in
+    document order: one per body paragraph and one per table row (cells joined
+    with " | "). Finished blocks are cleared from the tree as we go, so memory
+    stays bounded no matter how long the document is.
+    """
+    with zipfile.ZipFile(source) as zf, zf.open("word/document.xml") as xml:
+        body = None
+        paras = []   # run texts of each open paragraph (text boxes nest paragraphs)
+        rows = []    # cell texts of each open table row
+        cells = []   # paragraph texts of each open table cell
+        for event, elem in ET.iterparse(xml, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                if tag == _W + "p":
+                    paras.append([])
+                elif tag == _W + "tc":
+                    cells.append([])
+                elif tag == _W + "tr":
+                    rows.append([])
+                elif tag == _W + "body":
+                    body = elem
+                continue
+
+            if tag == _W + "t":
+                if paras:
+                    paras[-1].append(elem.text or "")
+            elif tag == _W + "tab":
+                if paras:
+                    paras[-1].append("\t")
+            elif tag in (_W + "br", _W + "cr"):
+                if paras:
+                    paras[-1].append("\n")
+            elif tag == _W + "p":
+                text = "".join(paras.pop())
+                if paras:
+                    paras[-1].append(text)
+                elif cells:
+                    cells[-1].append(text)
+                else:
+                    yield text
+            elif tag == _W + "tc":
+                cell_text = " ".join(t.strip() for t in cells.pop() if t.strip())
+                if rows:
+                    rows[-1].append(cell_text)
+            elif tag == _W + "tr":
+                row_text = " | ".join(c for c in rows.pop() if c)
+                if cells:  # nested table: the row belongs to the enclosing cell
+                    cells[-1].append(row_text)
+                elif row_text:
+                    yield row_text
 
-def extract_docx_text(file_path: str) -> str:
-    doc = docx.Document(file_path)
+            if body is not None and tag in (_W + "p", _W + "tbl") and not (paras or cells):
+                body.clear()
+
+def _docx_text_python_docx(source) -> str:
+    doc = docx.Document(source)
     paragraphs = [para.text for para in doc.paragraphs]
-    return clean_text("\n".join(paragraphs))
+    return "\n".join(paragraphs)
+
+def extract_docx_text(source, backend: str | None = None) -> str:
+    """source: file path or seekable binary file object. backend defaults to DOCX_TEXT_BACKEND."""
+    name = (backend or DOCX_TEXT_BACKEND).strip().lower()
+    if name == "python-docx":
+        return clean_text(_docx_text_python_docx(source))
+    if name != "stream":
+        raise ValueError(f"Unknown DOCX text backend: {name} (choose from stream, python-docx)")
+    return clean_text("\n".join(iter_docx_blocks(source)))
 
-def extract_txt_text(file_path: str) -> str:
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-        return clean_text(f.read())
+def extract_txt_text(source) -> str:
+    """source: file path or binary file object."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "r", encoding="utf-8", errors="ignore") as f:
+            return clean_text(f.read())
+    return clean_text(source.read().decode("utf-8", errors="ignore"))
 
 def detect_skills(text: str) -> list:
-    """Simple keyword match for skills — later replace with taxonomy + NLP."""
-    # Fixed list for determinism
-    known_skills = [
-        "python","java","javascript","c++","c#","sql","html","css",
-        "machine learning","deep learning","nlp","flask","django",
-        "react","excel","power bi","tableau"
-    ]
-    found = []
-    text_lower = text.lower()
-    for skill in known_skills:
-        if skill in text_lower:
-            # Title-case display regardless of match case in text
-            found.append(skill.title())
-    return sorted(set(found))
+    """Whole-word match against the shared skill taxonomy (one regex pass)."""
+    # Title-case display regardless of match case in text
+    return sorted({skill.title() for skill in SKILL_MATCHER.find(text.lower())})
 
 def extract_email(text: str) -> str:
     match = re.search(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[A-Za-z]{2,}", text)
@@ -71,39 +306,181 @@ def extract_education(text: str) -> str:
     return ""
 
 
+# --- Single-pass field extraction ---
+# Precompiled equivalents of the helpers above, used by process_resume via extract_fields()
+_EMAIL_RE = re.compile(r"[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}")
+_EDUCATION_RES = [re.compile(p) for p in (
+    r"(b\.?tech|bachelor|b\.?e\.?|be in [a-z\s]+)",
+    r"(m\.?tech|master|m\.?e\.?)",
+    r"(ph\.?d|doctorate)",
+)]
+# Skills and "N years" share one scan. Every branch starts with a literal (a digit or a
+# skill's first letter), which lets re jump between candidate positions.
+_DIGITS = "0123456789"
+_TOKEN_RE = re.compile("|".join(
+    [d + r"\d*\+?\s+year" for d in _DIGITS] + SKILL_MATCHER.branches
+))
+
+def extract_fields(text: str) -> dict:
+    """
+    Same results as extract_email / detect_skills / estimate_experience /
+    extract_education, but lower-cases once and gathers skills and experience
+    mentions in a single pass. Email and education only need the first hit,
+    which is usually near the top of a CV, so they stay as early-exit searches.
+    """
+    text_lower = text.lower()
+
+    email = ""
+    m = _EMAIL_RE.search(text_lower)
+    if m:
+        # Return the original casing; lower() keeps offsets unless non-ASCII case folding changed the length
+        email = text[m.start():m.end()] if len(text) == len(text_lower) else m.group(0)
+
+    education = ""
+    for pat in _EDUCATION_RES:
+        m = pat.search(text_lower)
+        if m:
+            education = m.group(0).title()
+            break
+
+    # Count in C, then resolve each distinct token once (tokens repeat a lot in CVs)
+    skills, years = set(), Counter()
+    for token, count in Counter(_TOKEN_RE.findall(text_lower)).items():
+        if token[0] in _DIGITS:
+            years[int(token[:len(token) - len(token.lstrip(_DIGITS))])] += count
+        else:
+            skills.add(SKILL_MATCHER.canonical(token).title())
+
+    return {
+        "email": email,
+        "skills": sorted(skills),
+        # Most common mention (likely total experience); ties keep first-seen order as in estimate_experience
+        "experience_years": years.most_common(1)[0][0] if years else 0,
+        "education": education,
+    }
+
+
+# --- Section segmentation ---
+# Heading line (case-insensitive, optional trailing ":"/"-") -> canonical section name
+SECTION_HEADINGS = {
+    "summary": ["summary", "professional summary", "career summary", "profile", "professional profile",
+                "objective", "career objective", "about me"],
+    "experience": ["experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "internships", "internship experience"],
+    "education": ["education", "academic background", "academics", "educational qualifications", "qualifications"],
+    "projects": ["projects", "project", "academic projects", "personal projects", "key projects"],
+    "skills": ["skills", "technical skills", "core skills", "key skills", "core competencies"],
+    "certifications": ["certifications", "certificates", "licenses"],
+    "achievements": ["achievements", "awards", "honors", "accomplishments"],
+}
+_HEADING_ALIASES = {alias: name for name, aliases in SECTION_HEADINGS.items() for alias in aliases}
+_HEADING_MAX_WORDS = 4
+# Qualified headings ("College Projects", "Relevant Work Experience") must look like a heading line
+_HEADING_LINE_RE = re.compile(r"^[A-Za-z][A-Za-z&/ ]*[:\-]?$")
+_SENTENCE_BREAK_RE = re.compile(r"(?<=[\.\!\?])\s+")
+_BULLET_RE = re.compile(r"^(\-|\u2022|\*|\d+\.)\s+")
+
+def _heading_name(line: str) -> str | None:
+    norm = line.strip().rstrip(":-").strip().lower()
+    if norm in _HEADING_ALIASES:
+        return _HEADING_ALIASES[norm]
+    # Combined headings such as "Education & Certifications" take the first part
+    words = norm.split()
+    if len(words) <= _HEADING_MAX_WORDS:
+        for n in (2, 1):
+            if len(words) > n and words[n] in ("&", "and", "/", "|"):
+                name = _HEADING_ALIASES.get(" ".join(words[:n]))
+                if name:
+                    return name
+        # Qualified headings ending in an alias: "College Projects", "Personal Project";
+        # only upper/title-case lines without digits, so prose like "strong communication skills" is not one
+        stripped = line.strip()
+        if len(words) > 1 and _HEADING_LINE_RE.match(stripped) and (stripped.isupper() or stripped.istitle()):
+            for n in (2, 1):
+                name = _HEADING_ALIASES.get(" ".join(words[-n:]))
+                if name:
+                    return name
+    return None
+
+def segment_resume(text: str) -> dict:
+    """
+    Split raw_text once into sections, bullet lines and sentences, all as
+    [start, end) character offsets into text, so consumers can slice what they need:
+      sections:  [{"name", "heading", "start", "end"}] (start = heading line, end = next heading)
+      bullets:   stripped lines starting with -, •, * or "1."
+      sentences: same boundaries as re.split(r"(?<=[.!?])\s+") with blanks dropped
+    """
+    sections, bullets = [], []
+    pos = 0
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped:
+            start = pos + len(line) - len(line.lstrip())
+            name = _heading_name(stripped)
+            if name:
+                if sections:
+                    sections[-1]["end"] = pos
+                sections.append({"name": name, "heading": stripped, "start": start, "end": len(text)})
+            elif _BULLET_RE.match(stripped):
+                bullets.append([start, start + len(stripped)])
+        pos += len(line)
+
+    sentences = []
+    prev = 0
+    for m in list(_SENTENCE_BREAK_RE.finditer(text)) + [None]:
+        end = m.start() if m else len(text)
+        piece = text[prev:end]
+        if piece.strip():
+            s = prev + len(piece) - len(piece.lstrip())
+            sentences.append([s, s + len(piece.strip())])
+        if m:
+            prev = m.end()
+
+    return {"sections": sections, "bullets": bullets, "sentences": sentences}
+
+
 # --- Main processing function ---
-def process_resume(file_path: str) -> dict:
+def process_resume(source, file_name: str | None = None) -> dict:
     """
     Extracts structured resume data from PDF/DOCX/TXT.
+    source may be a file path, raw bytes, or a seekable binary file object
+    (e.g. an upload spooled in memory); file_name supplies the extension and
+    display name when source is not a path.
     Returns deterministic JSON for consistent scoring.
     """
-
-    # Detect content type
-    mime_type = magic.Magic(mime=True).from_file(file_path)
-    ext = os.path.splitext(file_path)[1].lower()
+    if isinstance(source, (str, os.PathLike)):
+        file_name = file_name or os.path.basename(source)
+        mime_type = magic.Magic(mime=True).from_file(source)
+    else:
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        source.seek(0)
+        mime_type = magic.from_buffer(source.read(64 * 1024), mime=True)
+        source.seek(0)
+    file_name = os.path.basename(file_name or "")
+    ext = os.path.splitext(file_name)[1].lower()
 
     if mime_type == "application/pdf" or ext == ".pdf":
-        raw_text = extract_pdf_text(file_path)
+        raw_text = extract_pdf_text(source)
     elif mime_type in (
         "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
         "application/msword"
     ) or ext == ".docx":
-        raw_text = extract_docx_text(file_path)
+        raw_text = extract_docx_text(source)
     elif mime_type == "text/plain" or ext == ".txt":
-        raw_text = extract_txt_text(file_path)
+        raw_text = extract_txt_text(source)
     else:
         raise ValueError(f"Unsupported file format: {mime_type}")
 
     # Build structured parsed data
     parsed_data = {
-        "file_name": os.path.basename(file_path),
-        "email": extract_email(raw_text),
-        "skills": detect_skills(raw_text),
-        "experience_years": estimate_experience(raw_text),
-        "education": extract_education(raw_text),
+        "file_name": file_name,
+        **extract_fields(raw_text),
+        "segments": segment_resume(raw_text),
         "raw_text": raw_text
     }
 
-    print(f"[INFO] Processed resume: {os.path.basename(file_path)} "
+    print(f"[INFO] Processed resume: {file_name} "
           f"({len(raw_text)} chars, {len(parsed_data['skills'])} skills found)")
     return parsed_data
+
@@ -0,0 +1,204 @@
+# agents/scoring_pipeline.py
+import copy
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+from agents.ats_scoring_agent import score_resume
+from agents.parser_pool import ParseError, parse_resume
+from agents.task_queue import TaskFailed
+from database.db_operations import (
+    upsert_resume,
+    get_cached_score,
+    save_score,
+    acquire_lease,
+    lease_active,
+    release_lease,
+    get_resume_by_file_hash,
+    get_parsed_jobdesc,
+)
+
+# Cross-worker coalescing: the first worker to miss the score cache for a key holds a Mongo
+# lease while it scores; the others poll for its saved score instead of calling the LLM too.
+SCORE_LEASES = os.getenv("SCORE_LEASES", "1") == "1"
+SCORE_LEASE_SECONDS = float(os.getenv("SCORE_LEASE_SECONDS", "90"))  # > LLM deadline + save
+SCORE_LEASE_WAIT_SECONDS = float(os.getenv("SCORE_LEASE_WAIT_SECONDS", "60"))
+SCORE_LEASE_POLL_SECONDS = 0.25
+
+logger = logging.getLogger(__name__)
+
+# Lease owner id for this process
+_OWNER = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class SingleFlight:
+    """
+    In-process request coalescing: concurrent calls with the same key run fn once;
+    the others block on its Future and get the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def do(self, key, fn):
+        """Returns (result, shared); shared is True for callers that waited on another's call."""
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+        if not leader:
+            return fut.result(), True
+        try:
+            fut.set_result(fn())
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return fut.result(), False
+
+
+_flight = SingleFlight()
+
+
+def _wait_for_holder(lease_key, resume_hash, jd_hash, mode):
+    """Poll until the lease holder's score is saved or its lease ends; returns the score or None."""
+    deadline = time.monotonic() + SCORE_LEASE_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(SCORE_LEASE_POLL_SECONDS)
+        cached = get_cached_score(resume_hash, jd_hash, mode=mode)
+        if cached:
+            return cached
+        if not lease_active(lease_key):
+            return None
+    return None
+
+
+def _score_once(parsed_resume, job_role, jd_hash, parsed_jd, resume_hash, user_id, session_id, mode):
+    """Score and save unless another worker already did or is doing it; returns (score, from_cache)."""
+    if not SCORE_LEASES:
+        score = score_resume(parsed_resume, job_role, parsed_jd=parsed_jd, mode=mode)
+        save_score(resume_hash, jd_hash, job_role, score, user_id=user_id, session_id=session_id, mode=mode)
+        return score, False
+
+    lease_key = f"score:{resume_hash}:{jd_hash}:{mode}"
+    waited = False
+    while True:
+        if acquire_lease(lease_key, _OWNER, SCORE_LEASE_SECONDS):
+            try:
+                # The previous holder may have saved between our cache miss and the acquire
+                if waited:
+                    cached = get_cached_score(resume_hash, jd_hash, mode=mode)
+                    if cached:
+                        return cached, True
+                score = score_resume(parsed_resume, job_role, parsed_jd=parsed_jd, mode=mode)
+                save_score(resume_hash, jd_hash, job_role, score, user_id=user_id, session_id=session_id, mode=mode)
+                return score, False
+            finally:
+                release_lease(lease_key, _OWNER)
+        if waited:
+            # Waited the full budget on a holder that is still working; don't block the request further
+            score = score_resume(parsed_resume, job_role, parsed_jd=parsed_jd, mode=mode)
+            save_score(resume_hash, jd_hash, job_role, score, user_id=user_id, session_id=session_id, mode=mode)
+            return score, False
+        cached = _wait_for_holder(lease_key, resume_hash, jd_hash, mode)
+        if cached:
+            return cached, True
+        waited = True
+
+
+def score_parsed_resume(parsed_resume, job_role, jd_hash, parsed_jd, user_id=None, session_id=None,
+                        resume_hash=None, file_hash=None, mode="full"):
+    """
+    Upsert a parsed resume (unless resume_hash is already known from the parse cache)
+    and return (resume_hash, score, from_cache). Concurrent requests for the same
+    (resume_hash, jd_hash, mode) share one scoring call: in-process via SingleFlight,
+    across workers via a Mongo lease.
+    """
+    if resume_hash is None:
+        resume_hash = upsert_resume(parsed_resume, user_id=user_id, session_id=session_id, file_hash=file_hash)
+    logger.debug("resume_hash: %s", resume_hash)
+
+    cached_score = get_cached_score(resume_hash, jd_hash, mode=mode)
+    if cached_score:
+        return resume_hash, cached_score, True
+
+    if mode == "fast":
+        # Microseconds of work: coalescing would cost more than it saves
+        score, cached = score_resume(parsed_resume, job_role, parsed_jd=parsed_jd, mode=mode), False
+        save_score(resume_hash, jd_hash, job_role, score, user_id=user_id, session_id=session_id, mode=mode)
+    else:
+        (score, cached), shared = _flight.do(
+            (resume_hash, jd_hash, mode),
+            lambda: _score_once(parsed_resume, job_role, jd_hash, parsed_jd, resume_hash, user_id, session_id, mode),
+        )
+        if shared:
+            # Followers get their own copy; callers may adjust the payload before responding
+            score, cached = copy.deepcopy(score), True
+
+    score["difference_from_benchmark"] = {}
+    return resume_hash, score, cached
+
+
+def parse_upload(read_bytes, file_name, file_hash):
+    """
+    Parsed resume for an upload: the stored parse when these exact bytes were seen before,
+    otherwise a fresh parse (read_bytes is only called then). Returns (parsed_resume,
+    resume_hash or None); ParseError propagates.
+    """
+    # Parse cache: identical upload bytes skip extraction entirely
+    cached_doc = get_resume_by_file_hash(file_hash)
+    if cached_doc and cached_doc.get("parsed_json"):
+        # Same bytes, possibly under another name: report the name just uploaded
+        return {**cached_doc["parsed_json"], "file_name": file_name}, cached_doc["hash"]
+    # Parsed in a supervised worker process (time and memory limited)
+    return parse_resume(read_bytes(), file_name), None
+
+
+def score_upload(read_bytes, file_name, file_hash, job_role, jd_hash, parsed_jd, user_id=None, session_id=None,
+                 mode="full"):
+    """
+    Parse one uploaded resume (or reuse the parse cache for its file_hash) and score it.
+    Returns the /upload_resume response body; ParseError propagates for the caller to report.
+    """
+    parsed_resume, resume_hash = parse_upload(read_bytes, file_name, file_hash)
+    parse_cached = resume_hash is not None
+    resume_hash, score, cached = score_parsed_resume(
+        parsed_resume, job_role, jd_hash, parsed_jd, user_id=user_id, session_id=session_id,
+        resume_hash=resume_hash, file_hash=file_hash, mode=mode
+    )
+    return upload_response(parsed_resume, score, resume_hash, jd_hash, parsed_jd, mode, cached, parse_cached)
+
+
+def upload_response(parsed_resume, score, resume_hash, jd_hash, parsed_jd, mode, cached, parse_cached):
+    """The /upload_resume response body (also the stream's final "score" event and a task's result)."""
+    return {
+        "status": "success",
+        "parsed": parsed_resume,
+        "score": score,
+        "using_jd": bool(parsed_jd),
+        "mode": mode,
+        "cache": cached,
+        "parse_cache": parse_cached,
+        "resume_hash": resume_hash,
+        "jd_hash": jd_hash
+    }
+
+
+def run_score_task(payload):
+    """Task-queue handler for "score_resume" tasks queued by /upload_resume?task=true."""
+    jd_hash = payload.get("jd_hash")
+    parsed_jd = get_parsed_jobdesc(jd_hash) if jd_hash else None
+    try:
+        return score_upload(
+            lambda: bytes(payload["data"]), payload["file_name"], payload["file_hash"], payload["job_role"],
+            jd_hash, parsed_jd, user_id=payload.get("user_id"), session_id=payload.get("session_id"),
+            mode=payload.get("mode") or "full"
+        )
+    except ParseError as e:
+        raise TaskFailed(f"Resume could not be parsed: {e}")
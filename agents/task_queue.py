@@ -0,0 +1,100 @@
+# agents/task_queue.py
+import os
+import threading
+import traceback
+import uuid
+
+from database.db_operations import claim_task, enqueue_task, finish_task, requeue_task
+
+# Worker threads per API process (0 = leave tasks to standalone workers: python task_worker.py)
+TASK_WORKERS = int(os.getenv("TASK_WORKERS", "2"))
+TASK_POLL_SECONDS = float(os.getenv("TASK_POLL_SECONDS", "0.5"))
+# A task still marked running this long after it was claimed is assumed lost (worker crashed or
+# was killed) and handed out again; keep it well above parse timeout + LLM deadline
+TASK_LEASE_SECONDS = float(os.getenv("TASK_LEASE_SECONDS", "300"))
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "3"))
+
+
+class TaskFailed(Exception):
+    """A task error that retrying won't fix (e.g. an unparseable file)."""
+
+
+def _handlers():
+    # Imported lazily: the handlers pull in the scoring pipeline, which imports this module
+    from agents.scoring_pipeline import run_score_task
+    return {"score_resume": run_score_task}
+
+
+def run_one(owner: str) -> bool:
+    """Claim and run a single task; returns False when the queue was empty."""
+    task = claim_task(owner, TASK_LEASE_SECONDS)
+    if task is None:
+        return False
+    task_id = task["_id"]
+    if task.get("attempts", 1) > TASK_MAX_ATTEMPTS:
+        # Reclaimed after lease expiry too often: the task itself likely kills its worker
+        finish_task(task_id, owner, error=f"Gave up after {TASK_MAX_ATTEMPTS} attempts")
+        return True
+    try:
+        handler = _handlers().get(task.get("kind"))
+        if handler is None:
+            raise TaskFailed(f"Unknown task kind: {task.get('kind')}")
+        result = handler(task.get("payload") or {})
+    except TaskFailed as e:
+        finish_task(task_id, owner, error=str(e))
+    except Exception as e:
+        print(f"Task {task_id} attempt {task.get('attempts')} failed: {e}", flush=True)
+        traceback.print_exc()
+        if task.get("attempts", 1) >= TASK_MAX_ATTEMPTS:
+            finish_task(task_id, owner, error=f"Processing failed: {e}")
+        else:
+            requeue_task(task_id, owner, str(e))
+    else:
+        finish_task(task_id, owner, result=result)
+    return True
+
+
+def _worker_loop(stop: threading.Event):
+    owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    while not stop.is_set():
+        try:
+            if not run_one(owner):
+                stop.wait(TASK_POLL_SECONDS)
+        except Exception as e:
+            # Mongo hiccup while claiming/finishing: back off and keep the worker alive
+            print(f"Task worker error: {e}", flush=True)
+            stop.wait(TASK_POLL_SECONDS * 4)
+
+
+_workers = []
+_stop = threading.Event()
+_workers_lock = threading.Lock()
+_pid = None
+
+
+def start_task_workers(count: int = TASK_WORKERS, daemon: bool = True) -> list:
+    """Start `count` worker threads in this process (idempotent; restarts after a fork)."""
+    global _pid
+    with _workers_lock:
+        if _pid == os.getpid():
+            return _workers
+        _pid = os.getpid()
+        _workers.clear()
+        for n in range(max(0, count)):
+            t = threading.Thread(target=_worker_loop, args=(_stop,), name=f"task-worker-{n}", daemon=daemon)
+            t.start()
+            _workers.append(t)
+        return _workers
+
+
+def stop_task_workers(timeout: float = None):
+    _stop.set()
+    for t in list(_workers):
+        t.join(timeout)
+
+
+def submit_task(kind: str, payload: dict) -> str:
+    """Queue a task for any worker (in this process or a standalone one); returns its id."""
+    task_id = enqueue_task(kind, payload)
+    start_task_workers()
+    return task_id
@@ -1,11 +1,15 @@
 import os
 import json
 import hashlib
-from datetime import datetime, timezone
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any, List
 
-from pymongo import MongoClient, ASCENDING, DESCENDING
-from pymongo.errors import PyMongoError
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
+
+from utils.hll import hll_estimate, hll_register
+from utils.lru_cache import LRUCache
 
 # === Mongo connection ===
 # Uses DB name from URI (e.g., mongodb://host:27017/atsdb)
@@ -18,20 +22,77 @@ resumes = db["resumes"]
 jobdescs = db["jobdescs"]
 scores = db["scores"]
 jobs = db["jobs"]
+llm_cache = db["llm_cache"]
+leases = db["leases"]
+tasks = db["tasks"]
+score_rollups = db["score_rollups"]
 
 # === Indexes (idempotent) ===
 resumes.create_index([("hash", ASCENDING)], unique=True)
+resumes.create_index([("file_hashes", ASCENDING)])  # parse cache: upload bytes -> resume
+# Inverted skill index: multikey index over normalized skills (skill -> resume postings)
+resumes.create_index([("skill_keys", ASCENDING)])
 jobdescs.create_index([("hash", ASCENDING)], unique=True)
-scores.create_index([("resume_hash", ASCENDING), ("jd_hash", ASCENDING)], unique=True)
+# Score cache key includes the scoring mode ("full" = LLM + deterministic, "fast" = deterministic only).
+# One-time migration: scores written before modes existed were all full LLM scores.
+if "resume_hash_1_jd_hash_1" in scores.index_information():
+    scores.update_many({"mode": {"$exists": False}}, {"$set": {"mode": "full"}})
+    try:
+        scores.drop_index("resume_hash_1_jd_hash_1")
+    except OperationFailure:
+        pass  # another process (api / worker starting together) dropped it first
+scores.create_index([("resume_hash", ASCENDING), ("jd_hash", ASCENDING), ("mode", ASCENDING)], unique=True)
 scores.create_index([("created_at", DESCENDING)])
+scores.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)  # only fallback scores set it
 scores.create_index([("resume_hash", ASCENDING)])
 scores.create_index([("jd_hash", ASCENDING)])
+# score_json is a native subdocument; its headline numbers are copied to top-level fields so
+# reports aggregate server-side. Scores stored before that hold score_json as a JSON string.
+scores.create_index([("overall", ASCENDING)])
+scores.create_index([("job_role", ASCENDING), ("created_at", DESCENDING)])  # per-role reports
 jobs.create_index([("status", ASCENDING)])
+# LLM completion cache: _id is the prompt key; Mongo's TTL monitor drops expired entries
+llm_cache.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+llm_cache.create_index([("created_at", ASCENDING)])
+# Cross-worker leases (_id = lease key); expired leases are ignored at once and swept by TTL
+leases.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+tasks.create_index([("status", ASCENDING), ("created_at", ASCENDING)])  # queue order
+tasks.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)  # set once a task finishes
+# Report rollups (_id = "<mode>|<period>|<dim>|<key>"); period is "all" or a UTC day (YYYY-MM-DD)
+# Rollups from before they were keyed by mode mix fast and full scores: drop them (rebuild hint below)
+if "dim_1_key_1_period_1" in score_rollups.index_information():
+    score_rollups.delete_many({"mode": {"$exists": False}})
+    try:
+        score_rollups.drop_index("dim_1_key_1_period_1")
+    except OperationFailure:
+        pass  # another process dropped it first
+score_rollups.create_index([("mode", ASCENDING), ("dim", ASCENDING), ("key", ASCENDING), ("period", ASCENDING)],
+                           unique=True)
+
+# === Parsed-JD cache ===
+# A JD's hash is derived from its text, so a stored JD never changes: this in-process LRU
+# sits in front of the jobdescs collection, which is the tier shared by all workers.
+JD_CACHE_SIZE = int(os.getenv("JD_CACHE_SIZE", "256"))
+_jd_cache = LRUCache(JD_CACHE_SIZE)
+
+# === LLM completion cache ===
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))  # 0 disables the cache
+
+# === Task queue ===
+TASK_RESULT_TTL_HOURS = float(os.getenv("TASK_RESULT_TTL_HOURS", "24"))
+
+# Scores produced by the deterministic fallback (LLM down/invalid) are rescored after this long
+FALLBACK_SCORE_TTL_SECONDS = int(os.getenv("FALLBACK_SCORE_TTL_SECONDS", "600"))
 
 # === Helpers ===
 def _utc_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
+def skill_keys(skills: List[str]) -> List[str]:
+    """Normalized skill postings for the inverted index (same normalization as scoring)."""
+    return sorted({s.strip().lower() for s in (skills or []) if isinstance(s, str) and s.strip()})
+
 def sha256_text(text: str) -> str:
     return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
 
@@ -39,8 +100,13 @@ def sha256_text(text: str) -> str:
 def upsert_resume(
     parsed_resume: Dict[str, Any],
     user_id: Optional[str] = None,
-    session_id: Optional[str] = None
+    session_id: Optional[str] = None,
+    file_hash: Optional[str] = None
 ) -> str:
+    """
+    Upsert by raw_text hash. file_hash (sha256 of the uploaded bytes) is recorded so
+    later uploads of the same file can skip parsing via get_resume_by_file_hash().
+    """
     raw_text = parsed_resume.get("raw_text", "")
     r_hash = sha256_text(raw_text)
     now = _utc_iso()
@@ -53,29 +119,34 @@ def upsert_resume(
         "education": parsed_resume.get("education"),
         "experience_years": parsed_resume.get("experience_years"),
         "skills": parsed_resume.get("skills", []),
+        "skill_keys": skill_keys(parsed_resume.get("skills", [])),
         "raw_text": raw_text,
+        "segments": parsed_resume.get("segments"),  # section/bullet/sentence offsets into raw_text
         "parsed_json": parsed_resume,   # nested JSON is fine here
         "created_at": now,
         "updated_at": now,
     }
+    update = {"$setOnInsert": doc, "$set": {"updated_at": now}}
+    if file_hash:
+        update["$addToSet"] = {"file_hashes": file_hash}
     try:
         # Set on insert; always update updated_at
-        resumes.update_one(
-            {"hash": r_hash},
-            {"$setOnInsert": doc, "$set": {"updated_at": now}},
-            upsert=True
-        )
+        resumes.update_one({"hash": r_hash}, update, upsert=True)
     except PyMongoError as e:
         print("Resume upsert error:", e)
     return r_hash
 
+def jobdesc_hash(jd_text: str) -> str:
+    """Hash a JD is stored under; known before parsing, so repeat uploads can skip the parser."""
+    return sha256_text(jd_text)
+
 def upsert_jobdesc(
     parsed_jd: Dict[str, Any],
     jd_text: str,
     user_id: Optional[str] = None,
     session_id: Optional[str] = None
 ) -> str:
-    j_hash = sha256_text(jd_text or json.dumps(parsed_jd, ensure_ascii=False))
+    j_hash = jobdesc_hash(jd_text) if jd_text else sha256_text(json.dumps(parsed_jd, ensure_ascii=False))
     now = _utc_iso()
     doc = {
         "hash": j_hash,
@@ -92,16 +163,147 @@ def upsert_jobdesc(
             {"$setOnInsert": doc, "$set": {"updated_at": now}},
             upsert=True
         )
+        # Warm the cache: the first scoring requests against a new JD usually follow right away
+        if j_hash not in _jd_cache:
+            _jd_cache.put(j_hash, doc)
     except PyMongoError as e:
         print("JD upsert error:", e)
     return j_hash
 
+# === LLM completion cache ===
+def llm_cache_key(model: str, system: str, prompt: str) -> str:
+    # Length-prefix each part so boundaries between them can't collide
+    parts = [model or "", system or "", prompt or ""]
+    return sha256_text("".join(f"{len(p)}:{p}" for p in parts))
+
+def get_llm_completion(key: str) -> Optional[str]:
+    """Cached completion text for a prompt key, or None (expired entries count as misses)."""
+    if LLM_CACHE_MAX_ENTRIES <= 0:
+        return None
+    try:
+        row = llm_cache.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            {"content": 1}
+        )
+    except PyMongoError as e:
+        print("LLM cache read error:", e)
+        return None
+    return row.get("content") if row else None
+
+def save_llm_completion(key: str, model: str, content: str) -> None:
+    """Store a completion, then evict the oldest entries beyond LLM_CACHE_MAX_ENTRIES."""
+    if LLM_CACHE_MAX_ENTRIES <= 0:
+        return
+    now = datetime.now(timezone.utc)
+    try:
+        llm_cache.update_one(
+            {"_id": key},
+            {"$set": {
+                "model": model,
+                "content": content,
+                "created_at": now,
+                "expires_at": now + timedelta(hours=LLM_CACHE_TTL_HOURS),
+            }},
+            upsert=True
+        )
+        # estimated_document_count reads collection metadata, so this check is cheap
+        excess = llm_cache.estimated_document_count() - LLM_CACHE_MAX_ENTRIES
+        if excess > 0:
+            oldest = [d["_id"] for d in llm_cache.find({}, {"_id": 1}).sort("created_at", ASCENDING).limit(excess)]
+            llm_cache.delete_many({"_id": {"$in": oldest}})
+    except PyMongoError as e:
+        print("LLM cache write error:", e)
+
+# === Leases ===
+def acquire_lease(key: str, owner: str, ttl_seconds: float) -> bool:
+    """
+    Take the lease `key` for `owner` unless someone else holds an unexpired one.
+    Expiry bounds how long a crashed holder can block others.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        # Matches a missing lease (upsert inserts it) or an expired one (taken over);
+        # a live lease held by someone else makes the upsert collide on _id
+        leases.update_one(
+            {"_id": key, "expires_at": {"$lte": now}},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+def lease_active(key: str) -> bool:
+    return leases.count_documents({"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}}, limit=1) > 0
+
+def release_lease(key: str, owner: str) -> None:
+    try:
+        leases.delete_one({"_id": key, "owner": owner})
+    except PyMongoError as e:
+        print("Lease release error:", e)
+
+# === Task queue ===
+def enqueue_task(kind: str, payload: Dict[str, Any]) -> str:
+    task_id = uuid.uuid4().hex
+    now = datetime.now(timezone.utc)
+    tasks.insert_one({
+        "_id": task_id,
+        "kind": kind,
+        "status": "queued",
+        "payload": payload,
+        "attempts": 0,
+        "created_at": now,
+        "updated_at": now,
+    })
+    return task_id
+
+def claim_task(owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+    """
+    Atomically take the oldest queued task, or a running one whose worker's lease
+    expired (the worker died mid-task). Returns the task document or None.
+    """
+    now = datetime.now(timezone.utc)
+    return tasks.find_one_and_update(
+        {"$or": [
+            {"status": "queued"},
+            {"status": "running", "lease_expires_at": {"$lte": now}},
+        ]},
+        {"$set": {"status": "running", "owner": owner, "started_at": now, "updated_at": now,
+                  "lease_expires_at": now + timedelta(seconds=lease_seconds)},
+         "$inc": {"attempts": 1}},
+        sort=[("created_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def finish_task(task_id: str, owner: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+    """Record the outcome; the upload bytes are dropped and the task expires after TASK_RESULT_TTL_HOURS."""
+    now = datetime.now(timezone.utc)
+    tasks.update_one(
+        {"_id": task_id, "owner": owner},
+        {"$set": {"status": "error" if error is not None else "done", "result": result, "error": error,
+                  "finished_at": now, "updated_at": now,
+                  "expires_at": now + timedelta(hours=TASK_RESULT_TTL_HOURS)},
+         "$unset": {"payload.data": "", "lease_expires_at": ""}}
+    )
+
+def requeue_task(task_id: str, owner: str, error: str) -> None:
+    tasks.update_one(
+        {"_id": task_id, "owner": owner},
+        {"$set": {"status": "queued", "last_error": error, "updated_at": datetime.now(timezone.utc)},
+         "$unset": {"owner": "", "lease_expires_at": ""}}
+    )
+
+def get_task(task_id: str) -> Optional[Dict[str, Any]]:
+    return tasks.find_one({"_id": task_id}, {"payload": 0, "owner": 0, "lease_expires_at": 0, "expires_at": 0})
+
 # === Scores (cache/save/history) ===
-def get_cached_score(resume_hash: str, jd_hash: Optional[str]) -> Optional[Dict[str, Any]]:
+def get_cached_score(resume_hash: str, jd_hash: Optional[str], mode: str = "full") -> Optional[Dict[str, Any]]:
     """
     Returns the score_json as a Python dict if found; handles text storage transparently.
     """
-    q = {"resume_hash": resume_hash, "jd_hash": jd_hash}
+    q = {"resume_hash": resume_hash, "jd_hash": jd_hash, "mode": mode,
+         # The TTL monitor only sweeps once a minute; never serve an expired fallback score
+         "expires_at": {"$not": {"$lte": datetime.now(timezone.utc)}}}
     row = scores.find_one(q, {"_id": 0, "score_json": 1})
     if not row:
         return None
@@ -115,43 +317,263 @@ def get_cached_score(resume_hash: str, jd_hash: Optional[str]) -> Optional[Dict[
             return None
     return None
 
+# Headline numbers stored next to score_json (jd_match_score lives in jd_match_details)
+SCORE_FIELDS = ("overall", "keywords", "formatting", "grammar", "jd_match_score")
+
+def _score_fields(score_json: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level numeric fields for a score document; None where the score has no number."""
+    values = dict(score_json or {})
+    values["jd_match_score"] = (values.get("jd_match_details") or {}).get("jd_match_score")
+    return {
+        k: values[k] if isinstance(values.get(k), (int, float)) and not isinstance(values[k], bool) else None
+        for k in SCORE_FIELDS
+    }
+
+def _score_subdoc(score_json: Any) -> Dict[str, Any]:
+    """score_json as a BSON-safe dict; legacy JSON strings are decoded."""
+    if isinstance(score_json, str):
+        try:
+            score_json = json.loads(score_json) if score_json.strip() else {}
+        except ValueError:
+            return {"raw": score_json}
+    # Round-trip through JSON: tuples become lists, anything non-serializable a string
+    return json.loads(json.dumps(score_json or {}, ensure_ascii=False, default=str))
+
+# === Report rollups ===
+# Every stored (non-fallback) score is counted in rollup documents per scoring mode, all-time
+# and per UTC day, for all runs, its job_role and its JD's industry: runs, per-field sums and
+# counts, and HyperLogLog sketches of distinct resumes / JDs. save_score applies each change as
+# $inc/$max, so reports read a few small documents instead of scanning scores. Fallback scores
+# are left out: the TTL monitor deletes them without going through save_score.
+# Counted scores carry in_rollups; older ones are only subtracted once a rebuild counted them.
+_ROLLUP_PROJECTION = {"_id": 0, "resume_hash": 1, "jd_hash": 1, "job_role": 1, "industry": 1, "mode": 1,
+                      "created_at": 1, "in_rollups": 1, "score_json.fallback": 1, **{k: 1 for k in SCORE_FIELDS}}
+
+def _rollup_key(value: Any) -> Optional[str]:
+    key = value.strip().lower() if isinstance(value, str) else None
+    return key or None
+
+def _rollup_id(mode: str, period: str, dim: str, key: str) -> str:
+    return f"{mode}|{period}|{dim}|{key}"
+
+def _rollup_ops(doc: Dict[str, Any], sign: int) -> List[UpdateOne]:
+    """$inc/$max updates adding (sign=1) or removing (sign=-1) one score document's contribution."""
+    if (doc.get("score_json") or {}).get("fallback") or (sign < 0 and not doc.get("in_rollups")):
+        return []
+    inc = {"runs": sign}
+    for k in SCORE_FIELDS:
+        v = doc.get(k)
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            inc[f"sum.{k}"] = sign * v
+            inc[f"n.{k}"] = sign
+    update = {"$inc": inc}
+    if sign > 0:
+        # Sketches can't forget a value; a removed run's resume/JD stays counted until a rebuild
+        sketch = {}
+        for field, value in (("resumes", doc.get("resume_hash")), ("jds", doc.get("jd_hash"))):
+            if value:
+                reg, rank = hll_register(value)
+                sketch[f"hll_{field}.{reg}"] = rank
+        if sketch:
+            update["$max"] = sketch
+
+    created = doc.get("created_at")
+    day = (created.date().isoformat() if isinstance(created, datetime)
+           else str(created or _utc_iso())[:10])
+    mode = doc.get("mode") or "full"
+    targets = [("all", "*"), ("role", _rollup_key(doc.get("job_role"))), ("industry", _rollup_key(doc.get("industry")))]
+    ops = []
+    for period in ("all", day):
+        for dim, key in targets:
+            if key:
+                ops.append(UpdateOne(
+                    {"_id": _rollup_id(mode, period, dim, key)},
+                    {**update, "$setOnInsert": {"mode": mode, "period": period, "dim": dim, "key": key}},
+                    upsert=True
+                ))
+    return ops
+
+def backfill_score_industry() -> int:
+    """Store the JD's industry on scores saved before they carried it (one update per JD)."""
+    updated = 0
+    for jd_hash in scores.distinct("jd_hash", {"industry": {"$exists": False}}):
+        industry = (get_parsed_jobdesc(jd_hash) or {}).get("industry") if jd_hash else None
+        updated += scores.update_many({"jd_hash": jd_hash, "industry": {"$exists": False}},
+                                      {"$set": {"industry": industry}}).modified_count
+    return updated
+
+def _rollup_group_pipeline() -> List[Dict[str, Any]]:
+    """
+    Per (mode, day, job_role, industry) aggregates of every counted score, computed in Mongo:
+    runs, per-field sums and counts, and the distinct resume / JD hashes for the sketches.
+    """
+    def is_number(field):
+        return {"$in": [{"$type": f"${field}"}, ["double", "int", "long", "decimal"]]}
+
+    return [
+        {"$match": {"score_json.fallback": {"$ne": True}}},
+        {"$group": {
+            "_id": {
+                "mode": {"$ifNull": ["$mode", "full"]},
+                # created_at is an ISO string (_utc_iso); older rows may hold BSON dates
+                "day": {"$cond": [{"$eq": [{"$type": "$created_at"}, "date"]},
+                                  {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                                  {"$substrCP": [{"$ifNull": ["$created_at", ""]}, 0, 10]}]},
+                "job_role": "$job_role",
+                "industry": "$industry",
+            },
+            "runs": {"$sum": 1},
+            **{f"sum_{k}": {"$sum": {"$cond": [is_number(k), f"${k}", 0]}} for k in SCORE_FIELDS},
+            **{f"n_{k}": {"$sum": {"$cond": [is_number(k), 1, 0]}} for k in SCORE_FIELDS},
+            "resumes": {"$addToSet": "$resume_hash"},
+            "jds": {"$addToSet": "$jd_hash"},
+        }},
+    ]
+
+def rebuild_score_rollups() -> int:
+    """
+    Recompute score_rollups from the scores collection; returns the number of scores counted.
+    The grouping runs in Mongo (_rollup_group_pipeline); Python only folds the groups into
+    rollup documents (role and industry keys normalized) and fills in the sketches.
+    Saves that land while it runs may be counted twice or not at all, so run it when idle.
+    """
+    backfill_score_industry()
+    # Every score present now is counted below, so later rescores may subtract it
+    scores.update_many({"in_rollups": {"$ne": True}}, {"$set": {"in_rollups": True}})
+    rollups = {}
+    for group in scores.aggregate(_rollup_group_pipeline(), allowDiskUse=True):
+        g = group["_id"]
+        mode = g.get("mode") or "full"
+        day = g.get("day") or _utc_iso()[:10]
+        targets = [("all", "*"), ("role", _rollup_key(g.get("job_role"))), ("industry", _rollup_key(g.get("industry")))]
+        for period in ("all", day):
+            for dim, key in targets:
+                if not key:
+                    continue
+                r = rollups.setdefault(_rollup_id(mode, period, dim, key), {
+                    "_id": _rollup_id(mode, period, dim, key), "mode": mode, "period": period, "dim": dim, "key": key,
+                    "runs": 0, "sum": {}, "n": {}, "hll_resumes": {}, "hll_jds": {},
+                })
+                r["runs"] += group["runs"]
+                for k in SCORE_FIELDS:
+                    if group[f"n_{k}"]:
+                        r["sum"][k] = r["sum"].get(k, 0) + group[f"sum_{k}"]
+                        r["n"][k] = r["n"].get(k, 0) + group[f"n_{k}"]
+                for field in ("resumes", "jds"):
+                    sketch = r[f"hll_{field}"]
+                    for value in group[field]:
+                        if value:
+                            reg, rank = hll_register(value)
+                            sketch[reg] = max(sketch.get(reg, 0), rank)
+
+    score_rollups.delete_many({})
+    if rollups:
+        score_rollups.insert_many(list(rollups.values()), ordered=False)
+    return sum(r["runs"] for r in rollups.values() if r["period"] == "all" and r["dim"] == "all")
+
+def get_score_rollup(dim: str = "all", key: str = "*", days: int = 7, mode: str = "full") -> Dict[str, Any]:
+    """
+    Report figures for one rollup slice (dim "all" / "role" / "industry", key lowercased) of
+    one scoring mode, read from the all-time document and the last `days` daily documents.
+    """
+    if dim != "all":
+        key = _rollup_key(key) or ""
+    total = score_rollups.find_one({"_id": _rollup_id(mode, "all", dim, key)}) or {}
+    today = datetime.now(timezone.utc).date()
+    recent = score_rollups.find(
+        {"mode": mode, "dim": dim, "key": key,
+         "period": {"$gte": (today - timedelta(days=max(1, days) - 1)).isoformat(), "$lte": today.isoformat()}},
+        {"runs": 1}
+    )
+    sums, counts = total.get("sum") or {}, total.get("n") or {}
+    return {
+        "runs": total.get("runs", 0),
+        "recent_runs": sum(r.get("runs", 0) for r in recent),
+        "averages": {k: (sums.get(k, 0) / counts[k] if counts.get(k) else None) for k in SCORE_FIELDS},
+        "counts": {k: counts.get(k, 0) for k in SCORE_FIELDS},
+        # HyperLogLog estimates (~3% error past a few hundred)
+        "distinct_resumes": hll_estimate(total.get("hll_resumes") or {}),
+        "distinct_jds": hll_estimate(total.get("hll_jds") or {}),
+    }
+
 def save_score(
     resume_hash: str,
     jd_hash: Optional[str],
     job_role: str,
     score_json: Dict[str, Any],
     user_id: Optional[str] = None,
-    session_id: Optional[str] = None
+    session_id: Optional[str] = None,
+    mode: str = "full"
 ) -> None:
     """
-    Store score_json consistently as TEXT (JSON string) to avoid mixed-type columns downstream.
+    Store score_json as a subdocument, with its SCORE_FIELDS copied to the top level.
+    Fallback scores (score_json["fallback"]) expire after FALLBACK_SCORE_TTL_SECONDS so the
+    next request after an LLM outage gets a real score; a later full score clears the expiry.
     """
-    try:
-        score_json_str = json.dumps(score_json, ensure_ascii=False)
-    except Exception:
-        score_json_str = str(score_json)
+    score_doc = _score_subdoc(score_json)
+    parsed_jd = get_parsed_jobdesc(jd_hash) if jd_hash else None
 
     now = _utc_iso()
     doc = {
         "resume_hash": resume_hash,
         "jd_hash": jd_hash,
         "job_role": job_role,
-        "score_json": score_json_str,  # store as TEXT for consistency
+        "industry": (parsed_jd or {}).get("industry"),
+        "mode": mode,
+        "score_json": score_doc,
+        **_score_fields(score_doc),
+        "in_rollups": True,
+        "expires_at": (datetime.now(timezone.utc) + timedelta(seconds=FALLBACK_SCORE_TTL_SECONDS)
+                       if score_doc.get("fallback") else None),
         "user_id": user_id,
         "session_id": session_id,
         "created_at": now,
         "updated_at": now,
     }
-    scores.update_one(
-        {"resume_hash": resume_hash, "jd_hash": jd_hash},
+    previous = scores.find_one_and_update(
+        {"resume_hash": resume_hash, "jd_hash": jd_hash, "mode": mode},
         {"$set": doc},
-        upsert=True
+        projection=_ROLLUP_PROJECTION,
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
     )
+    if previous is not None and "industry" not in previous:
+        # Stored before scores carried industry; it was counted under this JD's industry
+        previous["industry"] = doc["industry"]
+    # A rescore replaces the stored run, so its old contribution comes out of the rollups
+    ops = (_rollup_ops(previous, -1) if previous else []) + _rollup_ops(doc, 1)
+    if ops:
+        try:
+            score_rollups.bulk_write(ops, ordered=False)
+        except PyMongoError as e:
+            # The score is saved; reports drift until python -m scripts.rebuild_score_rollups
+            print(f"Score rollup update failed: {e}", flush=True)
+
+def migrate_score_documents(batch_size: int = 500) -> int:
+    """
+    Convert scores stored with score_json as a JSON string to a subdocument and fill in
+    the top-level SCORE_FIELDS; returns the number of documents updated.
+    """
+    updated, ops = 0, []
+    query = {"$or": [{"score_json": {"$type": "string"}}, {"overall": {"$exists": False}}]}
+    for doc in scores.find(query, {"_id": 1, "score_json": 1}):
+        score_doc = _score_subdoc(doc.get("score_json"))
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"score_json": score_doc, **_score_fields(score_doc)}}))
+        if len(ops) >= batch_size:
+            updated += scores.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += scores.bulk_write(ops, ordered=False).modified_count
+    return updated
+
+# Not migrated here: it would block startup on a large collection, and an interrupted run
+# must stay visible. Check for leftovers instead of trusting the overall_1 index.
+if scores.find_one({"score_json": {"$type": "string"}}, {"_id": 1}):
+    print("scores hold score_json as JSON strings: run python -m scripts.migrate_scores", flush=True)
 
 def get_scoring_history(limit: int = 10, resume_hash: str = None) -> List[Dict[str, Any]]:
     """
-    Returns recent scoring documents. score_json is returned as stored (TEXT),
-    which the UI can parse/flatten as needed, avoiding mixed dict/string types in DataFrames.
+    Returns recent scoring documents with score_json (a dict) and the top-level SCORE_FIELDS.
     """
     match_stage = {}
     if resume_hash:
@@ -187,7 +609,9 @@ def get_scoring_history(limit: int = 10, resume_hash: str = None) -> List[Dict[s
                 "_id": 0,
                 "created_at": 1,                  # ISO string
                 "job_role": 1,
-                "score_json": 1,                  # TEXT (JSON string)
+                "mode": 1,
+                "score_json": 1,
+                **{k: 1 for k in SCORE_FIELDS},
                 "resume_file": "$resume_data.file_name",
                 "resume_email": "$resume_data.email",
                 "jd_hash": 1,
@@ -203,10 +627,74 @@ def get_scoring_history(limit: int = 10, resume_hash: str = None) -> List[Dict[s
 def get_resume_by_hash(resume_hash: str) -> Optional[Dict[str, Any]]:
     return resumes.find_one({"hash": resume_hash}, {"_id": 0})
 
+def get_resume_by_file_hash(file_hash: str) -> Optional[Dict[str, Any]]:
+    """Parse-cache lookup: the stored resume whose upload bytes hashed to file_hash."""
+    if not file_hash:
+        return None
+    return resumes.find_one({"file_hashes": file_hash}, {"_id": 0})
+
 def get_jobdesc_by_hash(jd_hash: str) -> Optional[Dict[str, Any]]:
-    return jobdescs.find_one({"hash": jd_hash}, {"_id": 0})
+    """Stored JD document, served from the in-process LRU when possible. Treat as read-only."""
+    if not jd_hash:
+        return None
+    doc = _jd_cache.get(jd_hash)
+    if doc is None:
+        doc = jobdescs.find_one({"hash": jd_hash}, {"_id": 0})
+        if doc:
+            _jd_cache.put(jd_hash, doc)
+    return doc
+
+def get_parsed_jobdesc(jd_hash: str) -> Optional[Dict[str, Any]]:
+    """Parsed JD for scoring, or None when the hash is unknown."""
+    doc = get_jobdesc_by_hash(jd_hash)
+    return doc.get("parsed_json") if doc else None
+
+def rebuild_skill_index(batch_size: int = 500) -> int:
+    """(Re)compute skill_keys for every resume; returns the number of documents updated."""
+    updated, ops = 0, []
+    for doc in resumes.find({}, {"_id": 1, "skills": 1, "skill_keys": 1}):
+        keys = skill_keys(doc.get("skills"))
+        if doc.get("skill_keys") != keys:
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"skill_keys": keys}}))
+        if len(ops) >= batch_size:
+            updated += resumes.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += resumes.bulk_write(ops, ordered=False).modified_count
+    return updated
+
+# Not backfilled here (it would block startup); resumes stored before the index have no skill_keys
+if resumes.find_one({"skill_keys": {"$exists": False}}, {"_id": 1}):
+    print("resumes without skill_keys: run python -m scripts.rebuild_skill_index", flush=True)
+
+# Not rebuilt here: api and worker processes start together, and two interleaved rebuilds
+# would double-count. Scores stored before rollups existed need the script run once.
+if score_rollups.estimated_document_count() == 0 and scores.estimated_document_count() > 0:
+    print("score_rollups is empty: run python -m scripts.rebuild_score_rollups to backfill reports", flush=True)
+
+def find_resumes_by_skills(skills: List[str], limit: int = 5000) -> List[Dict[str, Any]]:
+    """
+    Resumes sharing at least one skill with `skills`, read through the skill_keys index,
+    so the cost follows the matching postings rather than the corpus size. Past `limit`
+    matches, the ones sharing the most skills are kept (ranked in Mongo, most overlap
+    first). Returns only the fields the deterministic JD match needs.
+    """
+    keys = skill_keys(skills)
+    if not keys:
+        return []
+    return list(resumes.aggregate([
+        {"$match": {"skill_keys": {"$in": keys}}},
+        {"$addFields": {"skill_overlap": {"$size": {"$setIntersection": [{"$ifNull": ["$skill_keys", []]}, keys]}}}},
+        {"$sort": {"skill_overlap": -1, "hash": 1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "hash": 1, "file_name": 1, "skills": 1, "skill_keys": 1,
+                      "experience_years": 1, "education": 1}},
+    ], allowDiskUse=True))
 
 def delete_resume_by_hash(resume_hash: str) -> bool:
+    ops = [op for doc in scores.find({"resume_hash": resume_hash}, _ROLLUP_PROJECTION) for op in _rollup_ops(doc, -1)]
+    if ops:
+        score_rollups.bulk_write(ops, ordered=False)
     scores.delete_many({"resume_hash": resume_hash})
     result = resumes.delete_one({"hash": resume_hash})
     return result.deleted_count > 0
@@ -1,10 +1,20 @@
+import copy
+import json
 import os
 import re
-from flask import Flask, request, jsonify
+import zipfile
+from datetime import timezone
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from flask import Flask, Response, request, jsonify
 from werkzeug.utils import secure_filename
-from agents.resume_processing_agent import process_resume
-from agents.ats_scoring_agent import score_resume
+from agents.parser_pool import ParseError, parse_resumes
+from agents.resume_processing_agent import segment_resume
+from agents.ats_scoring_agent import SCORING_MODES, score_resume_fast, score_resumes
+from agents.bulk_scoring import rank_resumes
+from agents.scoring_pipeline import parse_upload, score_parsed_resume, score_upload, upload_response
+from agents.task_queue import submit_task, start_task_workers
 from agents.jd_analysis_agent import process_job_description
+from utils.file_utils import spool_upload, sha256_bytes
 
 # Stopwords list
 STOPWORDS = set("""
@@ -38,31 +48,98 @@ from database.db_operations import (
     save_score,
     get_scoring_history,
     get_resume_by_hash,
+    get_resume_by_file_hash,
     delete_resume_by_hash,
     insert_job,
     find_recommended_jobs,
-    get_jobdesc_by_hash
+    get_jobdesc_by_hash,
+    get_parsed_jobdesc,
+    jobdesc_hash,
+    find_resumes_by_skills,
+    get_task,
+    get_score_rollup
 )
 
 app = Flask(__name__)
 
-# Upload folder
-UPLOAD_FOLDER = "samples"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
 # Upload settings
 app.config["MAX_CONTENT_LENGTH"] = 5 * 1024 * 1024  # 5 MB
 ALLOWED_EXTENSIONS = {"pdf", "docx", "txt"}
 
-# Cache for latest JD
+# Batch upload settings (per-file limit stays at 5 MB)
+MAX_FILE_SIZE = 5 * 1024 * 1024
+BATCH_MAX_CONTENT_LENGTH = int(os.getenv("BATCH_MAX_CONTENT_MB", "100")) * 1024 * 1024
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "200"))
+
+# Latest JD uploaded to *this* process. Only a fallback for callers that send neither
+# jd_hash nor JD text; disable it when running more than one worker.
 LATEST_JD_HASH = None
 LATEST_JD_PARSED = None
+USE_LATEST_JD_FALLBACK = os.getenv("USE_LATEST_JD_FALLBACK", "1") == "1"
 
 
 def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def upload_name(filename: str) -> str:
+    """Sanitized display name that always keeps the (allowed) extension for type detection."""
+    return secure_filename(filename) or f"resume.{filename.rsplit('.', 1)[-1].lower()}"
+
+
+def _wants_task() -> bool:
+    return (request.form.get("task") or request.args.get("task") or "").strip().lower() in ("1", "true", "yes")
+
+
+def _scoring_mode():
+    """"full" (LLM + deterministic, default) or "fast" (deterministic only); None if invalid."""
+    mode = (request.form.get("mode") or request.args.get("mode") or "full").strip().lower()
+    return mode if mode in SCORING_MODES else None
+
+
+class UnknownJobDescription(LookupError):
+    pass
+
+
+def _ingest_jobdesc(jd_text, user_id=None, session_id=None):
+    """Parse and store a JD unless that exact text is already known; returns (jd_hash, parsed_jd)."""
+    jd_hash = jobdesc_hash(jd_text)
+    parsed_jd = get_parsed_jobdesc(jd_hash)
+    if parsed_jd is not None:
+        return jd_hash, parsed_jd
+    parsed_jd = process_job_description(jd_text)
+    jd_hash = upsert_jobdesc(parsed_jd, jd_text, user_id=user_id, session_id=session_id)
+    return jd_hash, parsed_jd
+
+
+def _resolve_jd(user_id=None, session_id=None):
+    """
+    JD for a scoring request, from the form: explicit jd_hash (loaded from the shared
+    jobdescs store), then inline jd_text / jd, then this process's latest upload.
+    Returns (jd_hash, parsed_jd); both None when no JD applies.
+    """
+    jd_hash = (request.form.get("jd_hash") or "").strip()
+    if jd_hash:
+        parsed_jd = get_parsed_jobdesc(jd_hash)
+        if parsed_jd is None:
+            raise UnknownJobDescription(jd_hash)
+        return jd_hash, parsed_jd
+
+    jd_text = (request.form.get("jd_text") or request.form.get("jd") or "").strip()
+    if jd_text:
+        return _ingest_jobdesc(jd_text, user_id=user_id, session_id=session_id)
+
+    if USE_LATEST_JD_FALLBACK:
+        return LATEST_JD_HASH, LATEST_JD_PARSED
+    return None, None
+
+
+@app.before_request
+def _ensure_task_workers():
+    # Idempotent; starts this process's TASK_WORKERS threads on its first request
+    start_task_workers()
+
+
 @app.errorhandler(413)
 def request_entity_too_large(e):
     return jsonify({"error": "File too large (max 5MB)"}), 413
@@ -71,8 +148,8 @@ def request_entity_too_large(e):
 # ===========================
 # Upload Resume
 # ===========================
-@app.route("/upload_resume", methods=["POST"])
-def upload_resume():
+def _resume_upload_error():
+    """Validation shared by the single-resume upload endpoints; an error response or None."""
     if "resume" not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
@@ -82,53 +159,320 @@ def upload_resume():
     if not allowed_file(file.filename):
         return jsonify({"error": "Invalid file type (pdf, docx, txt allowed)"}), 400
 
-    filename = secure_filename(file.filename)
-    file_path = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(file_path)
+    if not (request.form.get("job_role") or "").strip():
+        return jsonify({"error": "Job role is required"}), 400
+    if _scoring_mode() is None:
+        return jsonify({"error": f"Invalid mode (use one of: {', '.join(SCORING_MODES)})"}), 400
+    return None
+
+
+@app.route("/upload_resume", methods=["POST"])
+def upload_resume():
+    error = _resume_upload_error()
+    if error:
+        return error
+    file = request.files["resume"]
+    job_role = request.form["job_role"].strip()
+    mode = _scoring_mode()
+
+    # Parsed straight from the (spooled) upload stream; nothing is written to disk by name
+    filename = upload_name(file.filename)
+    stream, file_hash = spool_upload(file.stream)
+
+    user_id = (request.form.get("user_id") or "").strip() or None
+    session_id = (request.form.get("session_id") or "").strip() or None
+
+    try:
+        try:
+            jd_hash, parsed_jd = _resolve_jd(user_id=user_id, session_id=session_id)
+        except UnknownJobDescription:
+            return jsonify({"error": "Unknown jd_hash"}), 404
+
+        if _wants_task():
+            # Queue it and return at once; a task worker parses and scores (see GET /tasks/<id>)
+            task_id = submit_task("score_resume", {
+                "data": stream.read(),
+                "file_name": filename,
+                "file_hash": file_hash,
+                "job_role": job_role,
+                "jd_hash": jd_hash,
+                "user_id": user_id,
+                "session_id": session_id,
+                "mode": mode,
+            })
+            return jsonify({"status": "queued", "task_id": task_id, "status_url": f"/tasks/{task_id}"}), 202
+
+        return jsonify(score_upload(
+            stream.read, filename, file_hash, job_role, jd_hash, parsed_jd,
+            user_id=user_id, session_id=session_id, mode=mode
+        )), 200
+
+    except ParseError as e:
+        return jsonify({"error": "Resume could not be parsed", "detail": str(e)}), 422
+    except Exception as e:
+        return jsonify({"error": "Processing failed", "detail": str(e)}), 500
+    finally:
+        stream.close()
+
+
+# ===========================
+# Upload Resume (Server-Sent Events)
+# ===========================
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "10"))
+_stream_executor = ThreadPoolExecutor(max_workers=int(os.getenv("SSE_MAX_STREAMS", "32")),
+                                      thread_name_prefix="sse-score")
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@app.route("/upload_resume/stream", methods=["POST"])
+def upload_resume_stream():
+    """
+    Same inputs as /upload_resume, answered as text/event-stream:
+      parsed        -> parse result (as soon as the resume is parsed or found in the parse cache)
+      deterministic -> JD match breakdown, policy boosts and confidence interval (no LLM)
+      score         -> the full /upload_resume body, with the LLM-blended final score
+      error         -> {"error", "detail", "status"} if anything fails
+    """
+    error = _resume_upload_error()
+    if error:
+        return error
+    file = request.files["resume"]
+    job_role = request.form["job_role"].strip()
+    mode = _scoring_mode()
+    filename = upload_name(file.filename)
+    user_id = (request.form.get("user_id") or "").strip() or None
+    session_id = (request.form.get("session_id") or "").strip() or None
+
+    # Resolve everything that needs the request before streaming starts
+    stream, file_hash = spool_upload(file.stream)
+    try:
+        data = stream.read()
+    finally:
+        stream.close()
+    try:
+        jd_hash, parsed_jd = _resolve_jd(user_id=user_id, session_id=session_id)
+    except UnknownJobDescription:
+        return jsonify({"error": "Unknown jd_hash"}), 404
+    except Exception as e:
+        return jsonify({"error": "Processing failed", "detail": str(e)}), 500
+
+    def _wait(fut):
+        # Comment lines keep proxies from closing the connection during slow LLM calls
+        while True:
+            try:
+                return fut.result(timeout=SSE_HEARTBEAT_SECONDS)
+            except FutureTimeout:
+                yield ": keep-alive\n\n"
+
+    def events():
+        try:
+            parsed_resume, resume_hash = yield from _wait(
+                _stream_executor.submit(parse_upload, lambda: data, filename, file_hash))
+            yield _sse("parsed", {
+                "parsed": {k: v for k, v in parsed_resume.items() if k not in ("raw_text", "segments")},
+                "parse_cache": resume_hash is not None,
+            })
+
+            yield _sse("deterministic", {
+                "score": score_resume_fast(parsed_resume, job_role, parsed_jd),
+                "using_jd": bool(parsed_jd),
+                "jd_hash": jd_hash,
+            })
+
+            parse_cached = resume_hash is not None
+            resume_hash, score, cached = yield from _wait(_stream_executor.submit(
+                score_parsed_resume, parsed_resume, job_role, jd_hash, parsed_jd, user_id=user_id,
+                session_id=session_id, resume_hash=resume_hash, file_hash=file_hash, mode=mode))
+            yield _sse("score", upload_response(parsed_resume, score, resume_hash, jd_hash, parsed_jd, mode,
+                                                cached, parse_cached))
+        except ParseError as e:
+            yield _sse("error", {"error": "Resume could not be parsed", "detail": str(e), "status": 422})
+        except Exception as e:
+            yield _sse("error", {"error": "Processing failed", "detail": str(e), "status": 500})
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# ===========================
+# Task Status
+# ===========================
+@app.route("/tasks/<task_id>", methods=["GET"])
+def task_status(task_id):
+    try:
+        task = get_task(task_id)
+        if not task:
+            return jsonify({"status": "not_found", "message": "Task not found"}), 404
+        body = {
+            "task_id": task["_id"],
+            "kind": task.get("kind"),
+            "status": task.get("status"),  # queued | running | done | error
+            "attempts": task.get("attempts", 0),
+        }
+        for k in ("created_at", "started_at", "finished_at"):
+            if task.get(k):
+                # Mongo hands back naive datetimes that are in UTC; say so in the ISO string
+                body[k] = task[k].replace(tzinfo=task[k].tzinfo or timezone.utc).isoformat()
+        if task.get("status") == "done":
+            body["result"] = task.get("result")
+        elif task.get("status") == "error":
+            body["error"] = task.get("error")
+        return jsonify(body), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+# ===========================
+# Batch Upload Resumes
+# ===========================
+def _collect_batch_files():
+    """
+    Read every resume from the request (multipart list "resumes" and/or zip "archive")
+    into memory. Returns (entries, rejected) where each entry holds the file bytes,
+    file name and sha256 of the uploaded bytes.
+    """
+    entries, rejected = [], []
+
+    def _store(name, data):
+        if len(entries) >= BATCH_MAX_FILES:
+            rejected.append({"file_name": name, "status": "error", "error": f"Batch limit of {BATCH_MAX_FILES} files reached"})
+            return
+        if not allowed_file(name):
+            rejected.append({"file_name": name, "status": "error", "error": "Invalid file type (pdf, docx, txt allowed)"})
+            return
+        if len(data) > MAX_FILE_SIZE:
+            rejected.append({"file_name": name, "status": "error", "error": "File too large (max 5MB)"})
+            return
+        entries.append({"data": data, "file_name": upload_name(name), "file_hash": sha256_bytes(data)})
+
+    for f in request.files.getlist("resumes"):
+        if f and f.filename:
+            _store(f.filename, f.read(MAX_FILE_SIZE + 1))
+
+    archive = request.files.get("archive")
+    if archive and archive.filename:
+        try:
+            with zipfile.ZipFile(archive.stream) as zf:
+                for info in zf.infolist():
+                    base = os.path.basename(info.filename)
+                    if info.is_dir() or not base or base.startswith(".") or info.filename.startswith("__MACOSX/"):
+                        continue
+                    with zf.open(info) as member:
+                        # Read at most one byte past the limit; header sizes can't be trusted
+                        _store(base, member.read(MAX_FILE_SIZE + 1))
+        except zipfile.BadZipFile:
+            rejected.append({"file_name": archive.filename, "status": "error", "error": "Invalid zip archive"})
+
+    return entries, rejected
+
+
+@app.route("/upload_resume_batch", methods=["POST"])
+def upload_resume_batch():
+    # Batches legitimately exceed the single-upload limit; per-file size is checked separately
+    request.max_content_length = BATCH_MAX_CONTENT_LENGTH
 
     job_role = (request.form.get("job_role") or "").strip()
     if not job_role:
         return jsonify({"error": "Job role is required"}), 400
+    mode = _scoring_mode()
+    if mode is None:
+        return jsonify({"error": f"Invalid mode (use one of: {', '.join(SCORING_MODES)})"}), 400
 
     user_id = (request.form.get("user_id") or "").strip() or None
     session_id = (request.form.get("session_id") or "").strip() or None
 
     try:
-        parsed_resume = process_resume(file_path)
-        resume_hash = upsert_resume(parsed_resume, user_id=user_id, session_id=session_id)
-        print(f"resume_hash: {resume_hash}", flush=True)
-
-        jd_hash = LATEST_JD_HASH
-        parsed_jd = LATEST_JD_PARSED
-
-        cached_score = get_cached_score(resume_hash, jd_hash)
-        if cached_score:
-            return jsonify({
+        entries, rejected = _collect_batch_files()
+        if not entries and not rejected:
+            return jsonify({"error": "No files uploaded (use 'resumes' or 'archive')"}), 400
+
+        try:
+            jd_hash, parsed_jd = _resolve_jd(user_id=user_id, session_id=session_id)
+        except UnknownJobDescription:
+            return jsonify({"error": "Unknown jd_hash"}), 404
+
+        # Parse cache first; only unseen files go to the process pool
+        to_parse = []
+        for entry in entries:
+            doc = get_resume_by_file_hash(entry["file_hash"])
+            if doc and doc.get("parsed_json"):
+                entry["cached_doc"] = doc
+            else:
+                to_parse.append(entry)
+        parsed_items = iter(parse_resumes([(e["file_name"], e["data"]) for e in to_parse]))
+
+        results = []
+        pending = {}  # resume_hash -> (results waiting on it, parsed resume); duplicates score once
+        # Parsing fans out across the supervised worker processes; DB work stays on this thread
+        for entry in entries:
+            doc = entry.get("cached_doc")
+            if doc:
+                # The stored parse carries the first upload's name; report this upload's
+                item = {"file_name": entry["file_name"], "parsed": {**doc["parsed_json"], "file_name": entry["file_name"]}}
+            else:
+                item = next(parsed_items)
+            if "error" in item:
+                results.append({"file_name": item["file_name"], "status": "error", "error": item["error"]})
+                continue
+            parsed_resume = item["parsed"]
+            try:
+                resume_hash = doc["hash"] if doc else upsert_resume(
+                    parsed_resume, user_id=user_id, session_id=session_id, file_hash=entry["file_hash"]
+                )
+                cached_score = get_cached_score(resume_hash, jd_hash, mode=mode)
+            except Exception as e:
+                results.append({"file_name": item["file_name"], "status": "error", "error": str(e)})
+                continue
+            result = {
+                "file_name": item["file_name"],
                 "status": "success",
-                "parsed": parsed_resume,
-                "score": cached_score,
-                "using_jd": bool(parsed_jd),
-                "cache": True,
                 "resume_hash": resume_hash,
-                "jd_hash": jd_hash
-            }), 200
-
-        score = score_resume(parsed_resume, job_role, parsed_jd=parsed_jd)
-        save_score(resume_hash, jd_hash, job_role, score, user_id=user_id, session_id=session_id)
-        score["difference_from_benchmark"] = {}
+                "parsed": {k: v for k, v in parsed_resume.items() if k != "raw_text"},
+                "score": cached_score,
+                "cache": bool(cached_score),
+                "parse_cache": bool(doc)
+            }
+            results.append(result)
+            if not cached_score:
+                pending.setdefault(resume_hash, ([], parsed_resume))[0].append(result)
+
+        # Score-cache misses go to the LLM together, LLM_MAX_CONCURRENCY calls in flight
+        waiting = list(pending.values())
+        scored = score_resumes([(parsed_resume, job_role, parsed_jd) for _, parsed_resume in waiting], mode=mode)
+        for (same_resume, _), score in zip(waiting, scored):
+            error = str(score) if isinstance(score, Exception) else None
+            if error is None:
+                try:
+                    save_score(same_resume[0]["resume_hash"], jd_hash, job_role, score, user_id=user_id,
+                               session_id=session_id, mode=mode)
+                    score["difference_from_benchmark"] = {}
+                except Exception as e:
+                    error = str(e)
+            for n, result in enumerate(same_resume):
+                if error is not None:
+                    result.update({"status": "error", "error": error})
+                    result.pop("score", None)
+                else:
+                    result["score"] = score if n == 0 else copy.deepcopy(score)
+                    result["cache"] = n > 0
+        results += rejected
 
         return jsonify({
             "status": "success",
-            "parsed": parsed_resume,
-            "score": score,
+            "total": len(results),
+            "succeeded": sum(1 for r in results if r["status"] == "success"),
+            "failed": sum(1 for r in results if r["status"] == "error"),
             "using_jd": bool(parsed_jd),
-            "cache": False,
-            "resume_hash": resume_hash,
-            "jd_hash": jd_hash
+            "mode": mode,
+            "jd_hash": jd_hash,
+            "results": results
         }), 200
 
     except Exception as e:
-        return jsonify({"error": "Processing failed", "detail": str(e)}), 500
+        return jsonify({"error": "Batch processing failed", "detail": str(e)}), 500
 
 
 # ===========================
@@ -153,8 +497,7 @@ def upload_jobdesc():
     session_id = (request.form.get("session_id") or "").strip() or None
 
     try:
-        parsed_jd = process_job_description(jd_text)
-        jd_hash = upsert_jobdesc(parsed_jd, jd_text, user_id=user_id, session_id=session_id)
+        jd_hash, parsed_jd = _ingest_jobdesc(jd_text, user_id=user_id, session_id=session_id)
 
         LATEST_JD_HASH = jd_hash
         LATEST_JD_PARSED = parsed_jd
@@ -169,6 +512,57 @@ def upload_jobdesc():
         return jsonify({"error": str(e)}), 500
 
 
+# ===========================
+# Rank Stored Candidates for a JD
+# ===========================
+CANDIDATE_POOL_LIMIT = int(os.getenv("CANDIDATE_POOL_LIMIT", "5000"))
+
+
+@app.route("/jobdescs/<jd_hash>/candidates", methods=["GET"])
+def jd_candidates(jd_hash):
+    try:
+        limit = max(1, min(int(request.args.get("limit", 50)), 500))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    try:
+        parsed_jd = get_parsed_jobdesc(jd_hash)
+        if parsed_jd is None:
+            return jsonify({"status": "not_found", "message": "Job description not found"}), 404
+
+        jd_skills = normalize_list(parsed_jd.get("must_have_skills"))
+        # Only resumes sharing a must-have skill are fetched (skill_keys postings, most shared
+        # skills first), then ranked in one vectorized pass with the deterministic JD match
+        pool = find_resumes_by_skills(jd_skills, limit=CANDIDATE_POOL_LIMIT + 1)
+        # More matches than the pool holds: candidates outside it share fewer must-have skills,
+        # though experience/degree could still lift one of them above the last ranked
+        truncated = len(pool) > CANDIDATE_POOL_LIMIT
+        pool = pool[:CANDIDATE_POOL_LIMIT]
+        ranked = rank_resumes(pool, parsed_jd, top_k=limit)
+
+        jd_set = set(jd_skills)
+        candidates = []
+        for r in ranked:
+            doc = pool[r.pop("index")]
+            candidates.append({
+                "resume_hash": doc.get("hash"),
+                "file_name": doc.get("file_name"),
+                **r,
+                "matched_skills": sorted(jd_set & set(doc.get("skill_keys") or [])),
+            })
+
+        return jsonify({
+            "status": "success",
+            "jd_hash": jd_hash,
+            "must_have_skills": jd_skills,
+            "pool_size": len(pool),
+            "truncated": truncated,
+            "candidates": candidates
+        }), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 # ===========================
 # Resume CRUD
 # ===========================
@@ -381,6 +775,12 @@ def improve_resume():
         resume_text = (resume_doc.get("raw_text") or "")
         resume_tokens = set(tokenize(resume_text))
 
+        # Sections/bullets/sentences are segmented once at parse time; older documents are segmented here
+        segments = resume_doc.get("segments") or segment_resume(resume_text)
+        section_names = {sec["name"] for sec in segments["sections"]}
+        sentences = [resume_text[s:e] for s, e in segments["sentences"]]
+        bullets = [resume_text[s:e] for s, e in segments["bullets"]]
+
         if jd_doc:
             # ----- JD-based logic -----
             jd_parsed = jd_doc.get("parsed_json", {}) or {}
@@ -424,15 +824,15 @@ def improve_resume():
 
         # ---- Formatting Suggestions ----
         raw_lower = resume_text.lower()
-        if "summary" not in raw_lower:
+        if "summary" not in section_names:
             suggestions["format_suggestions"].append(
                 "Add a Professional Summary showcasing your core skills and achievements at the top."
             )
-        if "experience" not in raw_lower:
+        if "experience" not in section_names:
             suggestions["format_suggestions"].append(
                 "Add a Work Experience section with relevant details."
             )
-        if "education" not in raw_lower:
+        if "education" not in section_names:
             suggestions["format_suggestions"].append(
                 "Ensure an Education section is present."
             )
@@ -447,7 +847,7 @@ def improve_resume():
             tips.append("Add measurable impact using numbers or percentages.")
         if not re.search(r"\b(built|developed|designed|implemented|automated|deployed|analyzed|visualized|optimized)\b", raw_lower):
             tips.append("Start bullets with strong action verbs.")
-        if "project" not in raw_lower and "projects" not in raw_lower:
+        if "projects" not in section_names:
             tips.append("Include 1–2 project highlights to demonstrate applied skills.")
         if jd_doc and suggestions["missing_jd_skills"]:
             tips.append("Weave missing JD skills into relevant bullets.")
@@ -457,20 +857,9 @@ def improve_resume():
         # ---------- GRAMMAR AND STRUCTURE CHECKS ----------
         import re as _re
 
-        def _split_sentences(text: str):
-            return [s.strip() for s in _re.split(r'(?<=[\.\!\?])\s+', text) if s.strip()]
-
         def _tokenize_words(text: str):
             return _re.findall(r"[A-Za-z][A-Za-z\-']+", text)
 
-        def _extract_bullets(text: str):
-            lines = [ln.strip() for ln in text.splitlines()]
-            bullets = []
-            for ln in lines:
-                if _re.match(r'^(\-|\u2022|\*|\d+\.)\s+', ln):
-                    bullets.append(ln)
-            return bullets
-
         def _detect_repeated_words(text: str):
             issues = []
             pattern = _re.compile(r"\b(\w+)\s+\1\b", flags=_re.IGNORECASE)
@@ -479,24 +868,23 @@ def improve_resume():
                 issues.append(f"Repeated word detected: “{w} {w}”.")
             return issues
 
-        def _detect_long_sentences(text: str, max_words: int = 30):
+        def _detect_long_sentences(sentences, max_words: int = 30):
             issues = []
-            for s in _split_sentences(text):
+            for s in sentences:
                 wc = len(_tokenize_words(s))
                 if wc > max_words:
                     issues.append(f"Long sentence ({wc} words) — consider splitting: “{s[:120]}...”")
             return issues
 
-        def _detect_sentence_capitalization(text: str):
+        def _detect_sentence_capitalization(sentences):
             issues = []
-            for s in _split_sentences(text):
+            for s in sentences:
                 if s and s[0].isalpha() and not s.isupper():
                     issues.append(f"Sentence should start with a capital letter: “{s[:80]}...”")
             return issues
 
-        def _detect_long_bullets(text: str, max_words: int = 30):
+        def _detect_long_bullets(bullets, max_words: int = 30):
             issues = []
-            bullets = _extract_bullets(text)
             for b in bullets:
                 wc = len(_tokenize_words(b))
                 if wc > max_words:
@@ -511,8 +899,7 @@ def improve_resume():
                 issues.append(f"Possible passive voice — consider active phrasing: “{frag.strip()[:120]}...”")
             return issues
 
-        def _detect_inconsistent_punctuation(text: str):
-            bullets = _extract_bullets(text)
+        def _detect_inconsistent_punctuation(bullets):
             if not bullets:
                 return []
             endings = [b.strip().endswith('.') for b in bullets if len(_tokenize_words(b)) > 4]
@@ -524,11 +911,11 @@ def improve_resume():
 
         grammar_issues = []
         grammar_issues += _detect_repeated_words(resume_text)
-        grammar_issues += _detect_long_sentences(resume_text, max_words=30)
-        grammar_issues += _detect_sentence_capitalization(resume_text)
-        grammar_issues += _detect_long_bullets(resume_text, max_words=30)
+        grammar_issues += _detect_long_sentences(sentences, max_words=30)
+        grammar_issues += _detect_sentence_capitalization(sentences)
+        grammar_issues += _detect_long_bullets(bullets, max_words=30)
         grammar_issues += _detect_passive_voice_hints(resume_text)
-        grammar_issues += _detect_inconsistent_punctuation(resume_text)
+        grammar_issues += _detect_inconsistent_punctuation(bullets)
         suggestions["grammar_issues"] = grammar_issues[:25]
 
         return jsonify(suggestions), 200
@@ -550,61 +937,32 @@ def health():
     return {"status": "healthy"}, 200
 
 
+def _rollup_slice():
+    """Rollup slice selected by ?job_role= or ?industry= (default: all runs)."""
+    if request.args.get("job_role"):
+        return "role", request.args["job_role"]
+    if request.args.get("industry"):
+        return "industry", request.args["industry"]
+    return "all", "*"
+
+
 @app.route("/reports/kpis", methods=["GET"])
 def reports_kpis():
     try:
-        import datetime
-
-        # For backward compatibility; we'll compute last7 again with tz-aware below
-        now = datetime.datetime.utcnow()
-        _ = now - datetime.timedelta(days=7)
-
-        # 1) Total resumes processed (distinct in scoring history)
-        history_all = get_scoring_history(limit=10000)  # adjust up/down as needed
-        total_resumes = len({h.get("resume_hash") for h in history_all if h.get("resume_hash")})
-
-        # 2) Total JDs uploaded (inferred from unique jd_hashes in history)
-        jd_hashes = {h.get("jd_hash") for h in history_all if h.get("jd_hash")}
-        total_jds = len(jd_hashes)
-
-        # 3) Average overall score (from score_json.overall)
-        scores_vals = []
-        for h in history_all:
-            v = (h.get("score_json") or {}).get("overall")
-            if isinstance(v, (int, float)):
-                scores_vals.append(float(v))
-        avg_overall = round((sum(scores_vals) / len(scores_vals)) if scores_vals else 0, 1)
-
-        # 4) Runs in last 7 days (tz-aware comparison)
-        recent_runs_7d = 0
-        from datetime import datetime as dt, timezone, timedelta
-        last7 = dt.now(timezone.utc) - timedelta(days=7)
-
-        def _to_dt(ts):
-            if hasattr(ts, "isoformat"):
-                return ts if getattr(ts, "tzinfo", None) else ts.replace(tzinfo=timezone.utc)
-            if isinstance(ts, str):
-                s = ts.strip()
-                try:
-                    return dt.strptime(s, "%a, %d %b %Y %H:%M:%S %Z").replace(tzinfo=timezone.utc)
-                except Exception:
-                    pass
-                try:
-                    return dt.fromisoformat(s.replace("Z", "+00:00"))
-                except Exception:
-                    return None
-            return None
-
-        for h in history_all:
-            ts = _to_dt(h.get("created_at") or h.get("timestamp"))
-            if ts and ts >= last7:
-                recent_runs_7d += 1
+        # Read from the score_rollups documents save_score maintains; no scan of scores.
+        # One scoring mode at a time (?mode=, default full): fast and full scores don't average together
+        mode = _scoring_mode()
+        if mode is None:
+            return jsonify({"error": f"Invalid mode (use one of: {', '.join(SCORING_MODES)})"}), 400
+        dim, key = _rollup_slice()
+        r = get_score_rollup(dim, key, days=7, mode=mode)
+        avg_overall = r["averages"]["overall"]
 
         return jsonify({
-            "total_resumes": total_resumes,
-            "total_jds": total_jds,
-            "avg_overall": avg_overall,
-            "recent_runs_7d": recent_runs_7d
+            "total_resumes": r["distinct_resumes"],
+            "total_jds": r["distinct_jds"],
+            "avg_overall": round(avg_overall, 1) if avg_overall is not None else 0,
+            "recent_runs_7d": r["recent_runs"]
         }), 200
 
     except Exception as e:
@@ -646,8 +1004,7 @@ def reports_recent_scores():
             return None
 
         def _pluck_overall(h):
-            sj = h.get("score_json") or {}
-            v = sj.get("overall")
+            v = h.get("overall")
             if isinstance(v, (int, float)):
                 return float(v)
             if isinstance(v, str):
@@ -687,8 +1044,7 @@ def reports_recent_runs():
             return x if isinstance(x, str) else (str(x) if x is not None else "")
 
         def _pluck_overall(h):
-            sj = h.get("score_json") or {}
-            v = sj.get("overall")
+            v = h.get("overall")
             if isinstance(v, (int, float)):
                 return float(v)
             if isinstance(v, str):
@@ -716,31 +1072,15 @@ def reports_recent_runs():
 @app.route("/reports/avg_categories", methods=["GET"])
 def reports_avg_categories():
     try:
-        items = get_scoring_history(limit=10000)
-
-        sums = {
-            "skills": 0.0,
-            "experience": 0.0,
-            "education": 0.0,
-            "formatting": 0.0,
-            "keywords": 0.0
-        }
-        count = 0
-
-        for h in items:
-            sj = h.get("score_json") or {}
-            has_any = False
-            for k in list(sums.keys()):
-                v = sj.get(k)
-                if isinstance(v, (int, float)):
-                    sums[k] += float(v)
-                    has_any = True
-            if has_any:
-                count += 1
-
-        avgs = {k: (sums[k] / count if count else 0.0) for k in sums}
-
-        return jsonify({"avg_categories": avgs, "count": count}), 200
+        mode = _scoring_mode()
+        if mode is None:
+            return jsonify({"error": f"Invalid mode (use one of: {', '.join(SCORING_MODES)})"}), 400
+        dim, key = _rollup_slice()
+        r = get_score_rollup(dim, key, mode=mode)
+        return jsonify({
+            "avg_categories": {k: v or 0.0 for k, v in r["averages"].items()},
+            "count": r["counts"]["overall"]
+        }), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
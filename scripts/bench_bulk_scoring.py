@@ -0,0 +1,88 @@
+"""
+Check and time agents.bulk_scoring.match_matrix against the per-pair deterministic
+JD match (_jd_components) on synthetic resumes and JDs drawn from the skill taxonomy.
+
+Run from the repo root (imports the scoring agent, so the app's environment is needed):
+    python -m scripts.bench_bulk_scoring [--resumes 2000] [--jds 20] [--seed 7]
+
+Exits non-zero if any pair differs in jd_match, skills matched, or any coverage component.
+"""
+import argparse
+import random
+import sys
+import time
+
+from agents.ats_scoring_agent import DEGREE_LEVELS, _jd_components
+from agents.bulk_scoring import match_matrix
+from utils.skill_matcher import SKILL_MATCHER
+
+EDUCATION_TEXTS = ["", "B.Tech in Computer Science", "Bachelor of Science", "M.Sc Physics",
+                   "Master of Engineering", "PhD in Machine Learning", "Diploma in Design"]
+
+
+def synthetic(n_resumes: int, n_jds: int, seed: int):
+    rng = random.Random(seed)
+    skills = sorted(set(SKILL_MATCHER.aliases.values()))
+    degrees = [d.title() for d in DEGREE_LEVELS] + ["Associate"]
+    resumes = [
+        {
+            "skills": rng.sample(skills, rng.randint(0, min(12, len(skills)))),
+            "experience_years": rng.choice([None, 0, 1, 1.5, 2, 3, 4.5, 5, 8, 12]),
+            "education": rng.choice(EDUCATION_TEXTS),
+        }
+        for _ in range(n_resumes)
+    ]
+    jds = [
+        {
+            "must_have_skills": [s.title() for s in rng.sample(skills, rng.randint(0, min(8, len(skills))))],
+            "experience_required": rng.choice([None, 0, 1, 2, 3, 5, 7]),
+            "degrees_required": rng.sample(degrees, rng.randint(0, 2)),
+        }
+        for _ in range(n_jds)
+    ]
+    return resumes, jds
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--resumes", type=int, default=2000)
+    ap.add_argument("--jds", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    resumes, jds = synthetic(args.resumes, args.jds, args.seed)
+
+    t0 = time.perf_counter()
+    pairs = [[_jd_components(r, jd) for jd in jds] for r in resumes]
+    per_pair_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    m = match_matrix(resumes, jds)
+    bulk_ms = (time.perf_counter() - t0) * 1000
+
+    mismatches = 0
+    for i, row in enumerate(pairs):
+        for j, c in enumerate(row):
+            same = (
+                c["jd_match"] == m["jd_match"][i, j]
+                and c["matched_count"] == m["skills_matched"][i, j]
+                and c["total_req"] == m["skills_required"][j]
+                and c["skills_cov"] == m["skills_cov"][i, j]
+                and c["exp_cov"] == m["exp_cov"][i, j]
+                and c["degree_cov"] == m["degree_cov"][i, j]
+            )
+            if not same:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"MISMATCH resume {i} x jd {j}: per-pair {c} vs bulk jd_match={m['jd_match'][i, j]}")
+
+    n = len(resumes) * len(jds)
+    print(f"{len(resumes)} resumes x {len(jds)} JDs = {n} pairs")
+    print(f"per-pair: {per_pair_ms:9.1f} ms  ({per_pair_ms * 1000 / n:.2f} us/pair)")
+    print(f"bulk:     {bulk_ms:9.1f} ms  ({bulk_ms * 1000 / n:.2f} us/pair)  speedup {per_pair_ms / bulk_ms:.1f}x")
+    print(f"identical: {n - mismatches}/{n}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
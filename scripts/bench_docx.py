@@ -0,0 +1,47 @@
+"""
+Benchmark the streaming DOCX extractor against python-docx.
+
+Run from the repo root:
+    python -m scripts.bench_docx [--repeat 50] [files...]
+
+Defaults to every DOCX in samples/. For each file and backend reports best-of-5
+latency, Python heap peak, output length, and for the stream backend whether every
+python-docx paragraph is still present (the stream output adds table text).
+"""
+import argparse
+import glob
+import timeit
+import tracemalloc
+
+from agents.resume_processing_agent import extract_docx_text
+
+BACKENDS = ("python-docx", "stream")
+
+
+def heap_peak_mb(path: str, backend: str) -> float:
+    tracemalloc.start()
+    extract_docx_text(path, backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("files", nargs="*", help="DOCX files (default: samples/*.docx)")
+    ap.add_argument("--repeat", type=int, default=50, help="calls per timing round")
+    args = ap.parse_args()
+
+    files = args.files or sorted(glob.glob("samples/*.docx"))
+    print(f"{'file':28} {'backend':12} {'ms':>8} {'heap MB':>8} {'chars':>7}  superset")
+    for path in files:
+        reference = extract_docx_text(path, "python-docx")
+        for backend in BACKENDS:
+            ms = min(timeit.repeat(lambda: extract_docx_text(path, backend), number=args.repeat, repeat=5)) / args.repeat * 1000
+            text = extract_docx_text(path, backend)
+            superset = all(line in text for line in reference.splitlines() if line.strip())
+            print(f"{path[-28:]:28} {backend:12} {ms:>8.2f} {heap_peak_mb(path, backend):>8.2f} {len(text):>7}  {superset}")
+
+
+if __name__ == "__main__":
+    main()
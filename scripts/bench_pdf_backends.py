@@ -0,0 +1,116 @@
+"""
+Head-to-head benchmark of the PDF text backends behind extract_pdf_text().
+
+Run from the repo root:
+    python -m scripts.bench_pdf_backends [--backends pdfplumber,pypdfium2,pdfminer] [files...]
+
+Each (backend, file) pair runs in a fresh process so peak memory is not polluted by
+earlier runs. The backend is imported and warmed up on one page first; heap peak is
+taken in its own pass, and pages are timed in separate passes with tracemalloc off.
+Reported per pair:
+  - per-page latency (median / max, ms; best of --repeat passes per page)
+  - peak RSS growth over the post-warm-up baseline (MB) and Python heap peak (MB)
+  - text equivalence vs pdfplumber: word-sequence similarity, and whether the
+    parsed fields used for scoring (skills, email, experience, education) match
+"""
+import argparse
+import difflib
+import glob
+import multiprocessing as mp
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from agents.resume_processing_agent import PDF_BACKENDS, clean_text, extract_fields, iter_pdf_pages
+
+REFERENCE = "pdfplumber"
+
+
+def _max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _warm_up(backend: str, path: str) -> None:
+    """Import the backend and extract one page, so lazy imports and first-use setup aren't timed."""
+    for _ in iter_pdf_pages(path, backend, 0, 1):
+        pass
+
+
+def _timed_pages(backend: str, path: str) -> list:
+    page_ms = []
+    t0 = time.perf_counter()
+    for _ in iter_pdf_pages(path, backend):
+        t1 = time.perf_counter()
+        page_ms.append((t1 - t0) * 1000)
+        t0 = t1
+    return page_ms
+
+
+def _measure(backend: str, path: str, repeat: int) -> dict:
+    """Runs inside a fresh worker process."""
+    _warm_up(backend, path)
+    baseline_rss = _max_rss_mb()
+
+    # Memory pass: tracemalloc slows allocation-heavy code a lot, so nothing is timed here
+    tracemalloc.start()
+    pages = list(iter_pdf_pages(path, backend))
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_mb = _max_rss_mb() - baseline_rss
+
+    # Timing passes with tracemalloc stopped; best of `repeat` per page
+    runs = [_timed_pages(backend, path) for _ in range(max(1, repeat))]
+    return {
+        "page_ms": [min(times) for times in zip(*runs)],
+        "rss_mb": rss_mb,
+        "heap_mb": heap_peak / (1024 * 1024),
+        "text": clean_text("\n".join(pages)),
+    }
+
+
+def _run_isolated(backend: str, path: str, repeat: int) -> dict:
+    with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+        return pool.submit(_measure, backend, path, repeat).result()
+
+
+def _similarity(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, a.split(), b.split(), autojunk=False).ratio()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("files", nargs="*", help="PDF files (default: samples/*.pdf)")
+    ap.add_argument("--backends", default=",".join(PDF_BACKENDS), help="comma-separated backend names")
+    ap.add_argument("--repeat", type=int, default=3, help="timing passes per pair (best per page is reported)")
+    args = ap.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    files = args.files or sorted(glob.glob("samples/*.pdf"))
+
+    header = f"{'file':28} {'backend':11} {'pages':>5} {'med ms/pg':>9} {'max ms/pg':>9} {'rss MB':>7} {'heap MB':>7} {'text sim':>8}  fields"
+    print(header)
+    print("-" * len(header))
+    for path in files:
+        reference = _run_isolated(REFERENCE, path, args.repeat)
+        ref_fields = extract_fields(reference["text"])
+        for backend in backends:
+            try:
+                r = reference if backend == REFERENCE else _run_isolated(backend, path, args.repeat)
+            except Exception as e:
+                print(f"{path[-28:]:28} {backend:11} error: {e}")
+                continue
+            ms = r["page_ms"] or [0.0]
+            print(
+                f"{path[-28:]:28} {backend:11} {len(r['page_ms']):>5} {statistics.median(ms):>9.1f} {max(ms):>9.1f} "
+                f"{r['rss_mb']:>7.1f} {r['heap_mb']:>7.1f} {_similarity(reference['text'], r['text']):>8.3f}  "
+                f"{'same' if extract_fields(r['text']) == ref_fields else 'DIFF'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
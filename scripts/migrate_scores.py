@@ -0,0 +1,20 @@
+"""
+Convert stored scores to the native format: score_json as a subdocument plus the
+top-level numeric fields (overall, keywords, formatting, grammar, jd_match_score)
+that reports aggregate on. Run from the repo root once after upgrading (the app logs a
+hint at startup while string scores remain) and after restoring an older backup:
+    python -m scripts.migrate_scores
+"""
+import time
+
+from database.db_operations import migrate_score_documents
+
+
+def main():
+    t0 = time.perf_counter()
+    updated = migrate_score_documents()
+    print(f"scores migrated: {updated} documents updated in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""
+Recompute the report rollups (score_rollups collection) from the scores collection.
+
+Run from the repo root once after upgrading to a version with rollups (they are not built
+at startup), after restoring a backup, editing scores by hand, or if a rollup
+update failed (logged as "Score rollup update failed"); best run while no scoring is in flight:
+    python -m scripts.rebuild_score_rollups
+"""
+import time
+
+from database.db_operations import rebuild_score_rollups
+
+
+def main():
+    t0 = time.perf_counter()
+    counted = rebuild_score_rollups()
+    print(f"score rollups rebuilt from {counted} scores in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+Recompute the inverted skill index (resumes.skill_keys) for every stored resume.
+
+Run from the repo root once after upgrading (the app logs a hint at startup while resumes
+lack skill_keys), after changing skill normalization, or after restoring a backup:
+    python -m scripts.rebuild_skill_index
+"""
+import time
+
+from database.db_operations import rebuild_skill_index
+
+
+def main():
+    t0 = time.perf_counter()
+    updated = rebuild_skill_index()
+    print(f"skill index rebuilt: {updated} resumes updated in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -34,6 +34,41 @@ pages = [
 ]
 
 # === Auth Handlers ===
+def iter_sse(res):
+    """Yield (event, data) pairs from a streaming text/event-stream requests response."""
+    event, data_lines = "message", []
+    for line in res.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[5:].strip())
+        # lines starting with ":" are keep-alive comments
+
+def render_score_metrics(box, score, preliminary=False):
+    """Metric cards for a score payload, drawn into an st.empty() placeholder."""
+    def card(label, value):
+        return f"""
+            <div class="metric-card">
+                <div class="metric-label">{label}</div>
+                <div class="metric-value">{value}</div>
+            </div>
+        """
+    pending = "…" if preliminary else "—"
+    cards = [
+        card("Overall" + (" (JD match only)" if preliminary else ""), score.get("overall", "—")),
+        card("Keywords", score.get("keywords", "—")),
+        card("Formatting", score.get("formatting", pending)),
+        card("Grammar", score.get("grammar", pending)),
+        card("JD Match", score.get("jd_match_details", {}).get("jd_match_score", "—")),
+    ]
+    box.markdown('<div class="metric-grid">' + "".join(cards) + '</div>', unsafe_allow_html=True)
+
 def set_auth(email, name):
     st.session_state.auth = {"is_authenticated": True, "email": email, "name": name}
 
@@ -249,6 +284,7 @@ elif st.session_state.active_page == pages[1]:
 
             if res.status_code == 200:
                 st.success("✅ JD Parsed")
+                st.session_state["jd_hash"] = res.json().get("jd_hash")
                 st.json(res.json())
             else:
                 st.error(f"Error {res.status_code}: {res.text}")
@@ -274,6 +310,7 @@ elif st.session_state.active_page == pages[2]:
     resume_file = st.file_uploader("Upload Resume (PDF/DOCX/TXT)", type=["pdf", "docx", "txt"])
     job_role = st.text_input("Target Job Role", placeholder="e.g., Software Engineer")
     jd_text_opt = st.text_area("Optional: Paste Job Description")
+    fast_mode = st.checkbox("Fast mode (deterministic JD match only, no LLM)")
 
     if st.button("Score Resume"):
         if not resume_file or not job_role.strip():
@@ -281,33 +318,41 @@ elif st.session_state.active_page == pages[2]:
         else:
             try:
                 files = {"resume": resume_file}
-                data = {"job_role": job_role}
+                data = {"job_role": job_role, "mode": "fast" if fast_mode else "full"}
                 if jd_text_opt.strip():
-                    data["jd"] = jd_text_opt  # main.py currently uses latest cached JD; this is informational
-
-                res = requests.post(f"{BACKEND_URL}/upload_resume", files=files, data=data, timeout=120)
+                    data["jd_text"] = jd_text_opt
+                elif st.session_state.get("jd_hash"):
+                    # Score against the JD submitted on the JD page, whichever backend worker serves us
+                    data["jd_hash"] = st.session_state["jd_hash"]
+
+                # Streamed: parse result, then the deterministic JD match, then the final LLM-blended score
+                res = requests.post(f"{BACKEND_URL}/upload_resume/stream", files=files, data=data,
+                                    stream=True, timeout=(10, 120))
+                parsed = None
                 if res.status_code == 200:
-                    parsed = res.json()
+                    status_box = st.empty()
+                    metrics_box = st.empty()
+                    status_box.info("⏳ Parsing resume…")
+                    for event, payload in iter_sse(res):
+                        if event == "parsed":
+                            n_skills = len(payload.get("parsed", {}).get("skills") or [])
+                            status_box.info(f"✅ Parsed — {n_skills} skills found. Scoring…")
+                        elif event == "deterministic":
+                            render_score_metrics(metrics_box, payload.get("score", {}), preliminary=True)
+                            status_box.info("⏳ JD match ready — waiting for AI category scores…")
+                        elif event == "score":
+                            parsed = payload
+                            status_box.empty()
+                        elif event == "error":
+                            status_box.error(f"Error {payload.get('status', '')}: {payload.get('error')} — {payload.get('detail', '')}")
+
+                if parsed:
                     score = parsed.get("score", {})
                     # Ensure difference_from_benchmark is a simple object
                     if "difference_from_benchmark" in score:
                         score["difference_from_benchmark"] = {}
 
-                    st.markdown('<div class="metric-grid">', unsafe_allow_html=True)
-                    def metric(label, value):
-                        st.markdown(f"""
-                            <div class="metric-card">
-                                <div class="metric-label">{label}</div>
-                                <div class="metric-value">{value}</div>
-                            </div>
-                        """, unsafe_allow_html=True)
-
-                    metric("Overall", score.get("overall", "—"))
-                    metric("Keywords", score.get("keywords", "—"))
-                    metric("Formatting", score.get("formatting", "—"))
-                    metric("Grammar", score.get("grammar", "—"))
-                    metric("JD Match", score.get("jd_match_details", {}).get("jd_match_score", "—"))
-                    st.markdown('</div>', unsafe_allow_html=True)
+                    render_score_metrics(metrics_box, score)
 
                     st.markdown('<div class="chart-block mt-12">', unsafe_allow_html=True)
                     show_score_chart(score)
@@ -349,7 +394,7 @@ elif st.session_state.active_page == pages[2]:
                     with st.expander("📜 Raw API Output"):
                         st.json(parsed)
 
-                else:
+                elif res.status_code != 200:
                     st.error(f"Error {res.status_code}: {res.text}")
 
             except Exception as e:
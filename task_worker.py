@@ -0,0 +1,16 @@
+# task_worker.py
+# Standalone task workers (run alongside the API with TASK_WORKERS=0 there to size them independently):
+#   TASK_WORKERS=8 python task_worker.py
+import signal
+
+from agents.task_queue import TASK_WORKERS, start_task_workers, stop_task_workers
+
+if __name__ == "__main__":
+    workers = start_task_workers(max(1, TASK_WORKERS), daemon=False)
+    print(f"Started {len(workers)} task workers", flush=True)
+    signal.signal(signal.SIGTERM, lambda *_: stop_task_workers())
+    try:
+        for t in workers:
+            t.join()
+    except KeyboardInterrupt:
+        stop_task_workers()
@@ -0,0 +1,36 @@
+import hashlib
+import os
+import tempfile
+
+# Read uploads in 64 KB chunks so hashing never needs the whole file in memory
+CHUNK_SIZE = 64 * 1024
+
+# Uploads larger than this spill from memory to a private (already unlinked) temp file
+SPOOL_MAX_MEMORY = int(os.getenv("UPLOAD_SPOOL_MAX_MEMORY", str(1024 * 1024)))
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data or b"").hexdigest()
+
+
+def spool_upload(stream, max_memory: int = SPOOL_MAX_MEMORY):
+    """
+    Hash an upload stream while reading it and return (seekable_file, sha256 hex digest),
+    rewound to the start. Seekable streams (Werkzeug already spools request files) are
+    reused as-is; anything else is copied into a SpooledTemporaryFile, which stays in
+    memory up to max_memory bytes and never leaves a named file on disk.
+    """
+    h = hashlib.sha256()
+    if stream.seekable():
+        stream.seek(0)
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+        stream.seek(0)
+        return stream, h.hexdigest()
+
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        h.update(chunk)
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled, h.hexdigest()
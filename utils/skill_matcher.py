@@ -0,0 +1,93 @@
+import json
+import os
+import re
+
+# Taxonomy file: {"skills": ["python", {"name": "node.js", "aliases": ["nodejs"]}, ...]}
+TAXONOMY_PATH = os.getenv(
+    "SKILL_TAXONOMY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "skills_taxonomy.json"),
+)
+
+# A skill must not touch another word character (or +/#, so "c" never matches inside "c++").
+# This is what keeps "java" from matching inside "javascript".
+_BOUNDARY_CHARS = r"[\w+#]"
+_RIGHT_BOUNDARY = r"(?!" + _BOUNDARY_CHARS + ")"
+
+
+def _build_trie(terms) -> dict:
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    return trie
+
+
+def _trie_regex(node, end: str = "") -> str:
+    """
+    Compile a trie node into a regex, e.g. java|javascript -> java(?:script|<end>).
+    Python's re tries alternatives one by one, so a flat alternation costs O(#terms)
+    per text position; the trie shape costs O(term length) instead. Branches are
+    tried longest-first and backtrack to shorter terms when `end` fails.
+    """
+    branches = []
+    for ch in sorted(k for k in node if k):
+        # Any run of whitespace matches a space inside a multi-word skill
+        token = r"\s+" if ch == " " else re.escape(ch)
+        branches.append(token + _trie_regex(node[ch], end))
+    if "" in node:
+        branches.append(end)
+    if len(branches) == 1:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")"
+
+
+def trie_branches(trie: dict) -> list:
+    """
+    One top-level branch per first character, with the left-boundary check placed
+    *after* that literal. Because every branch starts with a literal, re can skip
+    straight to candidate positions instead of running a lookbehind at every
+    character, which roughly halves the cost of a scan.
+    """
+    left = r"(?<!" + _BOUNDARY_CHARS + ".)"
+    return [re.escape(ch) + left + _trie_regex(trie[ch], _RIGHT_BOUNDARY) for ch in sorted(trie)]
+
+
+class SkillMatcher:
+    """Finds taxonomy skills in text with a single regex pass."""
+
+    def __init__(self, aliases: dict):
+        # aliases: lower-case surface form -> canonical skill name
+        self.aliases = {" ".join(k.lower().split()): v for k, v in aliases.items() if k and k.strip()}
+        self.branches = trie_branches(_build_trie(self.aliases))
+        self._pattern = re.compile("|".join(self.branches)) if self.branches else None
+
+    def canonical(self, matched: str) -> str:
+        """Map matched surface text (any whitespace) to its canonical skill."""
+        return self.aliases[" ".join(matched.split())]
+
+    def find(self, text_lower: str) -> list:
+        """Return the sorted canonical skills found in already lower-cased text."""
+        if not self._pattern or not text_lower:
+            return []
+        return sorted({self.canonical(m) for m in self._pattern.findall(text_lower)})
+
+
+def load_skill_matcher(path: str = TAXONOMY_PATH) -> SkillMatcher:
+    with open(path, "r", encoding="utf-8") as f:
+        taxonomy = json.load(f)
+    aliases = {}
+    for entry in taxonomy.get("skills", []):
+        if isinstance(entry, str):
+            entry = {"name": entry}
+        name = (entry.get("name") or "").strip().lower()
+        if not name:
+            continue
+        for surface in [name] + list(entry.get("aliases") or []):
+            aliases[surface.strip().lower()] = name
+    return SkillMatcher(aliases)
+
+
+# Built once at import and shared by the resume and JD agents
+SKILL_MATCHER = load_skill_matcher()